@@ -1,12 +1,27 @@
-def analyze_strengths_and_weaknesses(interview_data, llm_model):
-        """Analyze interview responses using the fine-tuned model"""
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_stream import approximate_token_count, generate_text
+from tracing import tracer
+
+
+def _error_analysis():
+        return {
+                "strengths": ["Unable to analyze - technical error"],
+                "weaknesses": ["Analysis unavailable"],
+                "recommendations": ["Please retry analysis"],
+                "overall_assessment": "Technical error occurred during analysis"
+        }
+
+
+def _analysis_prompt(interview_data):
+        """Prompt asking for the four report sections over a set of Q/A pairs"""
 
         # Format interview data for analysis
         interview_text = ""
         for question, answer in interview_data.items():
                 interview_text += f"Q: {question}\nA: {answer}\n\n"
 
-        prompt = f"""As an experienced visa officer, analyze the following interview responses and provide a comprehensive assessment:
+        return f"""As an experienced visa officer, analyze the following interview responses and provide a comprehensive assessment:
 
 {interview_text}
 
@@ -24,45 +39,177 @@ RECOMMENDATIONS:
 OVERALL ASSESSMENT:
 - [Overall evaluation and visa recommendation rationale]"""
 
+
+@tracer.traced("analysis")
+def analyze_strengths_and_weaknesses(interview_data, llm_model, on_delta=None, context=None, max_tokens=1000):
+        """Analyze interview responses using the fine-tuned model, streaming text to on_delta if given"""
+
         try:
-                response = llm_model.generate(prompt, max_tokens=1000, temperature=0.7)
-
-                # Parse the structured response
-                analysis = {
-                        "strengths": [],
-                        "weaknesses": [],
-                        "recommendations": [],
-                        "overall_assessment": ""
-                }
-
-                current_section = None
-                lines = response.strip().split('\n')
-
-                for line in lines:
-                        line = line.strip()
-                        if line.upper().startswith('STRENGTHS:'):
-                                current_section = 'strengths'
-                        elif line.upper().startswith('WEAKNESSES:'):
-                                current_section = 'weaknesses'
-                        elif line.upper().startswith('RECOMMENDATIONS:'):
-                                current_section = 'recommendations'
-                        elif line.upper().startswith('OVERALL ASSESSMENT:'):
-                                current_section = 'overall_assessment'
-                        elif line.startswith('-') and current_section in ['strengths', 'weaknesses', 'recommendations']:
-                                analysis[current_section].append(line[1:].strip())
-                        elif current_section == 'overall_assessment' and line:
-                                analysis['overall_assessment'] += line + ' '
-
-                analysis['overall_assessment'] = analysis['overall_assessment'].strip()
-
-                return analysis
+                response = generate_text(llm_model, _analysis_prompt(interview_data), max_tokens=max_tokens,
+                                         temperature=0.7, on_delta=on_delta, context=context)
+
+                return parse_analysis(response)
 
         except Exception as e:
                 print(f"Error in analysis: {e}")
-                return {
-                        "strengths": ["Unable to analyze - technical error"],
-                        "weaknesses": ["Analysis unavailable"],
-                        "recommendations": ["Please retry analysis"],
-                        "overall_assessment": "Technical error occurred during analysis"
-                }
-        
\ No newline at end of file
+                return _error_analysis()
+
+
+def parse_analysis(response):
+        """Parse a STRENGTHS/WEAKNESSES/RECOMMENDATIONS/OVERALL ASSESSMENT response into a dict"""
+        analysis = {
+                "strengths": [],
+                "weaknesses": [],
+                "recommendations": [],
+                "overall_assessment": ""
+        }
+
+        current_section = None
+        lines = response.strip().split('\n')
+
+        for line in lines:
+                line = line.strip()
+                if line.upper().startswith('STRENGTHS:'):
+                        current_section = 'strengths'
+                elif line.upper().startswith('WEAKNESSES:'):
+                        current_section = 'weaknesses'
+                elif line.upper().startswith('RECOMMENDATIONS:'):
+                        current_section = 'recommendations'
+                elif line.upper().startswith('OVERALL ASSESSMENT:'):
+                        current_section = 'overall_assessment'
+                elif line.startswith('-') and current_section in ['strengths', 'weaknesses', 'recommendations']:
+                        analysis[current_section].append(line[1:].strip())
+                elif current_section == 'overall_assessment' and line:
+                        analysis['overall_assessment'] += line + ' '
+
+        analysis['overall_assessment'] = analysis['overall_assessment'].strip()
+
+        return analysis
+
+
+@tracer.traced("answer_analysis")
+def analyze_answer(question, answer, llm_model, context=None):
+        """Assess a single question/answer pair with a short generation"""
+
+        prompt = f"""As an experienced visa officer, assess this single interview response:
+
+Q: {question}
+A: {answer}
+
+Provide at most two short points per section in the following format:
+
+STRENGTHS:
+- [Strength shown in this answer]
+
+WEAKNESSES:
+- [Concern raised by this answer]
+
+RECOMMENDATIONS:
+- [How to improve this answer]"""
+
+        response = generate_text(llm_model, prompt, max_tokens=200, temperature=0.7, context=context)
+        return parse_analysis(response)
+
+
+def _dedupe(items):
+        """Drop repeated points, comparing case and punctuation insensitively"""
+        seen = set()
+        unique = []
+        for item in items:
+                key = " ".join("".join(ch for ch in item.lower() if ch.isalnum() or ch.isspace()).split())
+                if key and key not in seen:
+                        seen.add(key)
+                        unique.append(item)
+        return unique
+
+
+@tracer.traced("analysis_merge")
+def merge_analyses(partial_analyses, llm_model, on_delta=None, context=None):
+        """Merge per-answer analyses, generating only the short overall assessment"""
+
+        merged = {
+                "strengths": _dedupe([item for partial in partial_analyses for item in partial["strengths"]]),
+                "weaknesses": _dedupe([item for partial in partial_analyses for item in partial["weaknesses"]]),
+                "recommendations": _dedupe([item for partial in partial_analyses for item in partial["recommendations"]]),
+                "overall_assessment": ""
+        }
+
+        findings = ""
+        for section in ("strengths", "weaknesses", "recommendations"):
+                findings += f"{section.upper()}:\n" + "".join(f"- {item}\n" for item in merged[section]) + "\n"
+
+        prompt = f"""As an experienced visa officer, these are the findings from an applicant's interview:
+
+{findings}
+Write a short OVERALL ASSESSMENT (2-3 sentences) with your visa recommendation rationale."""
+
+        try:
+                response = generate_text(llm_model, prompt, max_tokens=150, temperature=0.7, on_delta=on_delta,
+                                         context=context)
+                # Models sometimes repeat the findings before the assessment, keep only that section
+                merged["overall_assessment"] = parse_analysis(response)["overall_assessment"] or " ".join(
+                        response.replace("OVERALL ASSESSMENT:", "").split()
+                )
+        except Exception as e:
+                print(f"Error in analysis merge: {e}")
+                merged["overall_assessment"] = "Technical error occurred during analysis"
+
+        return merged
+
+
+def chunk_interview(interview_data, token_budget, count_tokens=approximate_token_count):
+        """Split Q/A pairs into consecutive chunks whose text stays within token_budget"""
+        chunks = []
+        current = {}
+        current_tokens = 0
+
+        for question, answer in interview_data.items():
+                pair_tokens = count_tokens(f"Q: {question}\nA: {answer}\n\n")
+                # A single oversized pair still gets a chunk of its own
+                if current and current_tokens + pair_tokens > token_budget:
+                        chunks.append(current)
+                        current = {}
+                        current_tokens = 0
+                current[question] = answer
+                current_tokens += pair_tokens
+
+        if current:
+                chunks.append(current)
+        return chunks
+
+
+@tracer.traced("analysis_chunk")
+def analyze_chunk(chunk, llm_model, context=None):
+        """Map step of analyze_map_reduce; returns None when the chunk could not be analyzed"""
+        try:
+                response = generate_text(llm_model, _analysis_prompt(chunk), max_tokens=400, temperature=0.7,
+                                         context=context)
+                return parse_analysis(response)
+        except Exception as e:
+                # Placeholder findings would be merged into the report as real ones, leave the chunk out
+                print(f"Error analyzing chunk of {len(chunk)} answer(s), leaving it out of the report: {e}")
+                return None
+
+
+@tracer.traced("analysis_map_reduce")
+def analyze_map_reduce(interview_data, llm_model, token_budget=1000, count_tokens=approximate_token_count,
+                       on_delta=None, context=None, max_parallel=8):
+        """Analyze token-budgeted chunks of the interview in parallel and merge the findings"""
+
+        chunks = chunk_interview(interview_data, token_budget, count_tokens)
+        print(f"Map-reduce analysis over {len(chunks)} chunk(s)")
+
+        if not chunks:
+                return merge_analyses([], llm_model, on_delta=on_delta, context=context)
+
+        # The inference backend batches the concurrent chunk requests together
+        with ThreadPoolExecutor(max_workers=min(len(chunks), max_parallel)) as executor:
+                partial_analyses = list(executor.map(
+                        tracer.propagate(lambda chunk: analyze_chunk(chunk, llm_model, context=context)),
+                        chunks
+                ))
+        partial_analyses = [partial for partial in partial_analyses if partial is not None]
+        if not partial_analyses:
+                return _error_analysis()
+
+        return merge_analyses(partial_analyses, llm_model, on_delta=on_delta, context=context)
@@ -1,115 +1,296 @@
 import os
-import threading
+import asyncio
 import base64
+import sys
 from flask import Flask, jsonify, request, render_template
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-import whisper
 # New Imports for Locally trained model
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
+from llm_backends import create_backend
 import json
 import tempfile
 import time
-import pyttsx3
 import uuid
 from question_gen import generate_custom_questions
-from analyzeSW import analyze_strengths_and_weaknesses
+from analyzeSW import analyze_strengths_and_weaknesses, analyze_map_reduce
 from follow_up_gen import generate_follow_up
 from description import visa_interview_prompt
+from whisper_registry import WhisperModelRegistry
+from whisper_batcher import BatchedTranscriber
+from prefix_cache import PrefixCache
+from interview_runtime import InterviewRuntime
+from session_store import SessionStore
+from audio_conversion import decode_audio_bytes, WHISPER_SAMPLE_RATE
+from live_transcription import LiveTranscriber
+from tts_service import TTSService
+from followup_speculation import FollowUpSpeculator
+from incremental_analysis import IncrementalAnalyzer
+from question_cache import QuestionCache
+from question_bank import QuestionBank, DEFAULT_INDEX_PATH, build_question_bank
+from model_loader import ModelLoader
+from prefork import PreforkServer, worker_tag
+from tracing import tracer
 
 
 # Initial Config
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", ping_timeout=300, ping_interval=120, max_http_buffer_size=50*1024*1024)
+# Answer audio arrives as a binary attachment, so the buffer only needs to fit the raw recording
+MAX_AUDIO_UPLOAD_MB = int(os.environ.get("MAX_AUDIO_UPLOAD_MB", "16"))
+socketio = SocketIO(app, cors_allowed_origins="*", ping_timeout=300, ping_interval=120, max_http_buffer_size=MAX_AUDIO_UPLOAD_MB*1024*1024)
 
-# Track Active Interview Sessions
-active_sessions = {}
+# Session archive for completed interviews evicted from memory (disabled when unset)
+SESSION_ARCHIVE_DIR = os.environ.get("SESSION_ARCHIVE_DIR", "")
 
-# Creating a TEMP directory in project root
-TEMP_DIR = os.path.join(os.getcwd(), 'temp_audio')
-if not os.path.exists(TEMP_DIR):
-    os.makedirs(TEMP_DIR)
 
+def _archive_path(session_id):
+    # Session ids come from clients, keep them from escaping the archive directory
+    if not session_id or not session_id.replace("_", "").isalnum():
+        return None
+    return os.path.join(SESSION_ARCHIVE_DIR, f"{session_id}.json")
 
-def speak_question(question):
-    """Helper function to speak a question using TTS"""
+
+def archive_session(session_id, session):
+    """Persist the results of a completed session before it leaves memory"""
+    path = _archive_path(session_id)
+    if not SESSION_ARCHIVE_DIR or path is None:
+        return
+    os.makedirs(SESSION_ARCHIVE_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as archive_file:
+        json.dump({
+            "questions": session["questions"],
+            "interview_data": session["interview_data"],
+            "analysis": session["analysis"],
+            "updated_portfolio": session["updated_portfolio"],
+            "completed": session["completed"]
+        }, archive_file)
+
+
+def load_archived_session(session_id):
+    """Return an archived session or None"""
+    path = _archive_path(session_id)
+    if not SESSION_ARCHIVE_DIR or path is None or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as archive_file:
+        return json.load(archive_file)
+
+
+# Track Active Interview Sessions, finished ones are evicted by TTL, LRU and memory cap
+active_sessions = SessionStore(
+    ttl_seconds=int(os.environ.get("SESSION_TTL_SECONDS", "3600")),
+    max_sessions=int(os.environ.get("SESSION_MAX_COUNT", "1000")),
+    max_bytes=int(os.environ.get("SESSION_MAX_MB", "256")) * 1024 * 1024,
+    on_archive=archive_session
+)
+
+# Whisper models shared by all sessions, comma separated sizes e.g. "base,small"
+WHISPER_MODEL_SIZES = os.environ.get("WHISPER_MODEL_SIZES", "base").split(",")
+WHISPER_MODEL_SIZE = WHISPER_MODEL_SIZES[0].strip()
+whisper_registry = WhisperModelRegistry(WHISPER_MODEL_SIZES)
+# Silence is trimmed before transcription and long answers split at pauses
+WHISPER_VAD = os.environ.get("WHISPER_VAD", "1") == "1"
+WHISPER_VAD_SPLIT = os.environ.get("WHISPER_VAD_SPLIT", "1") == "1"
+# Answers finishing within the batching window share one encoder pass
+whisper_batcher = BatchedTranscriber(
+    whisper_registry,
+    size=WHISPER_MODEL_SIZE,
+    batch_wait=float(os.environ.get("WHISPER_BATCH_WAIT", "0.05")),
+    max_batch_size=int(os.environ.get("WHISPER_MAX_BATCH_SIZE", "8"))
+)
+
+# Generated questions are reused for the same consulate, course, university and resume
+question_cache = QuestionCache(
+    ttl_seconds=int(os.environ.get("QUESTION_CACHE_TTL_SECONDS", str(24 * 3600))),
+    max_entries=int(os.environ.get("QUESTION_CACHE_MAX_ENTRIES", "512")),
+    disk_dir=os.environ.get("QUESTION_CACHE_DIR") or None,
+    diversity=float(os.environ.get("QUESTION_CACHE_DIVERSITY", "0.0"))
+)
+
+# Real officer questions indexed offline by question_bank.py, used when the LLM falls short
+QUESTION_BANK_PATH = os.environ.get("QUESTION_BANK_PATH", DEFAULT_INDEX_PATH)
+
+
+def load_question_bank(path):
+    """Load the question bank, building it from the bundled corpora on first start or when outdated"""
     try:
-        engine = pyttsx3.init()
-        engine.setProperty('rate', 160)
-        voices = engine.getProperty('voices')
-        if len(voices) > 1:
-            engine.setProperty('voice', voices[1].id)
-        engine.say(question)
-        engine.runAndWait()
-        engine.stop()
-    except Exception as e:
-        print(f"Error with Text to Speech: {e}")
-        return str(e)
-    return None
-
-class VisaOfficerLLM:
-    def __int__(self, model_path="visa_officer_merged"):
-        print(f"Loading Custom Fine Tuned Model from {model_path}...")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_path,
-            torch_dtype=torch.float16,
-            device_map="auto",
-            low_cpu_mem_usage=True
-        )
-        self.conversion_history = []
-        print("Fine-tuned model loaded successfully!")
+        if not os.path.exists(path) or not QuestionBank.is_current(path):
+            build_question_bank(path)
+        return QuestionBank.load(path)
+    except (OSError, ValueError) as e:
+        print(f"Question bank unavailable, using the built-in fallback questions: {e}")
+        return None
 
-        # Hyper Parameters here Tune if Necessary after interpretation!
-    def generate(self, prompt, max_tokens=512, temperature=0.7):
-            """Generate response using the fine-tuned model"""
-            system_prompt = """You are an experienced Visa Officer conducting a visa interview. You are professional, thorough, and fair. You ask relevant questions 
-                   to assess the applicant's eligibility and intentions. Be direct but courteous."""
 
-            # Message Format
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ]
+question_bank = load_question_bank(QUESTION_BANK_PATH)
 
-            try:
-                formatted_input = self.tokenizer.apply_chat_template(
-                    messages,
-                    tokenize=False,
-                    add_generation_prompt=True
-                )
-            except:
-                # Fallback Formatting if the above template doesn't work
-                formatted_input = f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n{system_prompt}<|eot_id|><|start_header_id|>user<|end_header_id|>\n{prompt}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n"
-
-            inputs = self.tokenizer.encode(formatted_input, return_tensors="pt")
-
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    inputs,
-                    max_new_tokens=max_tokens,
-                    temperature=temperature,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id
-                )
+# "generate" writes questions from scratch, "retrieve_rewrite" personalizes question bank entries
+QUESTION_STRATEGY = os.environ.get("QUESTION_STRATEGY", "generate")
+question_strategy_stats = {}
 
-            response = self.tokenizer.decode(outputs[0][len(inputs[0]):], skip_special_tokens=True)
-            return response.strip()
 
+def record_question_metrics(metrics):
+    """Accumulate latency and token counts per question generation strategy"""
+    if "strategy" not in metrics:
+        return
+    print(f"Question generation metrics: {metrics}")
+    totals = question_strategy_stats.setdefault(metrics["strategy"], {
+        "runs": 0, "latency_seconds": 0.0, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0
+    })
+    totals["runs"] += 1
+    for field in ("latency_seconds", "llm_calls", "prompt_tokens", "completion_tokens"):
+        totals[field] += metrics[field]
 
-# Initialize the New Model Here
-visa_llm = VisaOfficerLLM()
 
+# Question audio is rendered once, cached and sent to the browser
+tts_service = TTSService(
+    audio_format=os.environ.get("TTS_AUDIO_FORMAT", "wav"),
+    max_cache_bytes=int(os.environ.get("TTS_CACHE_MAX_MB", "64")) * 1024 * 1024
+)
 
-def run_interview(session_id, description, resume_data, num_questions=5):
-    """Background thread to run interview process with dynamic inputs"""
+
+def send_question_audio(session_id, question, question_number, audio=None):
+    """Render (or reuse) the audio for a question and send it to the session room"""
+    try:
+        with tracer.span("tts", question_number=question_number, cached=audio is not None) as span:
+            if audio is None:
+                audio = tts_service.synthesize(question)
+            span.tag(audio_bytes=len(audio))
+        socketio.emit('question_audio', {
+            'audio': audio,
+            'mime': tts_service.mime_type,
+            'question_number': question_number
+        }, room=session_id)
+    except Exception as e:
+        print(f"Error with Text to Speech: {e}")
+        socketio.emit('tts_error', {'error': str(e)}, room=session_id)
+
+
+# Inference backend: transformers (GPU), gguf (quantized on CPU via llama.cpp) or http (local server)
+# gguf needs the optional llama-cpp-python build: pip install -r requirements-gguf.txt
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "transformers")
+LLM_BACKEND_OPTIONS = {
+    "transformers": {
+        "model_path": os.environ.get("LLM_MODEL_PATH", "visa_officer_merged"),
+        # auto: float16 on GPU, bfloat16 on CPUs with native support, float32 otherwise; int8 is opt-in
+        "precision": os.environ.get("LLM_PRECISION", "auto"),
+        "self_check": os.environ.get("LLM_SELF_CHECK", "1") == "1"
+    },
+    "gguf": {
+        "model_path": os.environ.get("GGUF_MODEL_PATH", "visa_officer_gguf"),
+        "quantization": os.environ.get("GGUF_QUANTIZATION", "int4"),
+        "n_threads": int(os.environ.get("GGUF_THREADS", "0")) or None
+    },
+    "http": {
+        "endpoint": os.environ.get("LLM_HTTP_URL", "http://localhost:11434/v1"),
+        "model": os.environ.get("LLM_HTTP_MODEL", "llama3")
+    }
+}
+
+# All sessions share one batching scheduler in front of the model
+LLM_MAX_BATCH_SIZE = int(os.environ.get("LLM_MAX_BATCH_SIZE", "8"))
+PREFIX_CACHE_MAX_MB = int(os.environ.get("PREFIX_CACHE_MAX_MB", "512"))
+prefix_cache = PrefixCache(max_bytes=PREFIX_CACHE_MAX_MB * 1024 * 1024)
+
+
+def load_llm(report):
+    """Load the configured backend and put the batching scheduler in front of it"""
+    if SERVER_WORKERS > 1 and LLM_BACKEND == "transformers":
+        import torch
+
+        # Forward passes in the parent (the int8 self-check) would otherwise start an OpenMP
+        # pool, which forked workers inherit in a broken state; workers size their own pools
+        torch.set_num_threads(1)
+    backend = create_backend(LLM_BACKEND, progress=report, **LLM_BACKEND_OPTIONS.get(LLM_BACKEND, {}))
+    scheduler = None
+    if backend.name == "transformers":
+        from inference_scheduler import InferenceScheduler
+
+        scheduler = InferenceScheduler(backend, max_batch_size=LLM_MAX_BATCH_SIZE, prefix_cache=prefix_cache)
+    # llama.cpp and HTTP servers schedule their own requests and are called directly
+    return {"backend": backend, "scheduler": scheduler, "engine": scheduler or backend}
+
+
+# Models load on background threads; with MODEL_WARMUP=background the server starts
+# accepting connections right away and /api/ready reports progress until they are warm
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "background")
+model_loader = ModelLoader()
+model_loader.add("llm", load_llm)
+model_loader.add("whisper", lambda report: whisper_registry.preload(report=report))
+
+
+def get_llm():
+    """Loaded backend, scheduler and the engine requests go through, waiting if still warming up"""
+    return model_loader.get("llm")
+
+
+# SERVER_WORKERS > 1 forks that many Socket.IO workers after loading the models once;
+# the parent routes each session's traffic to the worker that owns it
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "1"))
+PREFORK_BASE_PORT = int(os.environ.get("PREFORK_BASE_PORT", "5100"))
+WORKER_INDEX = None
+
+
+def warm_up():
+    """Start loading the models and the TTS engine; call once from the serving process.
+
+    __main__ and run_worker call it, other launchers should call it from their
+    post-fork/startup hook. Nothing starts on import, so tools and tests that
+    import app don't load models, and the TTS engine is up before the loop needs it.
+    """
+    tts_service.start()
+    model_loader.start()
+
+
+def load_models_before_fork():
+    """Load every model in the parent so forked workers share the weights"""
+    if not model_loader.wait():
+        raise RuntimeError(f"Models failed to load: {model_loader.status()['models']}")
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_initialized():
+        raise RuntimeError("CUDA state can't be shared with forked workers, use SERVER_WORKERS=1 on GPU nodes")
+
+
+def run_worker(index, port):
+    global WORKER_INDEX
+    WORKER_INDEX = index
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        # Split the cores between workers instead of every worker using all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // SERVER_WORKERS))
+    # The parent loaded the models before forking, the TTS thread has to be started here
+    warm_up()
+    socketio.run(app=app, host='127.0.0.1', port=port)
+
+
+# Interview flow state machine: generating_questions -> awaiting_answer ->
+# (generating_followup) -> awaiting_answer ... -> analyzing -> completed.
+# Each transition runs on the shared runtime loop; blocking LLM and TTS calls go
+# to its worker pool, so a session waiting for an answer holds no thread.
+INTERVIEW_WORKERS = int(os.environ.get("INTERVIEW_WORKERS", "16"))
+ANSWER_TIMEOUT_SECONDS = 300
+# "incremental" scores each answer as it arrives, "full" analyzes everything at the end
+# (switching to "map_reduce" over token-budgeted chunks when the interview is too long)
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "incremental")
+ANALYSIS_CHUNK_TOKENS = int(os.environ.get("ANALYSIS_CHUNK_TOKENS", "1000"))
+interview_runtime = InterviewRuntime(max_workers=INTERVIEW_WORKERS)
+
+
+def stream_to_room(session_id, event, stage):
+    """Return an on_delta callback pushing partial LLM output to the session room"""
+    def on_delta(delta):
+        socketio.emit(event, {'delta': delta, 'stage': stage}, room=session_id)
+    return on_delta
+
+
+async def run_interview(session_id, description, resume_data, num_questions=5, course="", university=""):
+    """Set up the session and generate its questions, then ask the first one"""
     global active_sessions
 
     try:
         print(f"Starting interview session: {session_id}")
+        tracer.bind(session_id=session_id)
+        # Normally warm already, start_interview refuses sessions while models load
+        llm = (await interview_runtime.run_blocking(get_llm))["engine"]
 
         # Step 1: Save description to temporary file
         des_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.txt')
@@ -125,12 +306,10 @@ def run_interview(session_id, description, resume_data, num_questions=5):
         res_file.close()
         print("Saved resume file successfully!")
 
-        # Initialize LLM and Use it Here!
-        llm = visa_llm
-
         # Initialize the session
         session = {
             "active": True,
+            "state": "generating_questions",
             "questions": [],
             "current_index": 0,
             "interview_data": {},
@@ -139,8 +318,18 @@ def run_interview(session_id, description, resume_data, num_questions=5):
             "generate_followup": True,
             "updated_portfolio": {},
             "waiting_for_answer": False,
-            "answer_received": threading.Event(),
-            "original_question_count": num_questions
+            "answer_timeout": None,
+            "original_question_count": num_questions,
+            "original_questions_asked": 0,
+            "description": description,
+            "resume_data": resume_data,
+            "followup_speculator": FollowUpSpeculator(
+                llm, interview_runtime.submit_blocking, context=description
+            ),
+            "incremental_analyzer": IncrementalAnalyzer(
+                llm, interview_runtime.submit_blocking, context=description
+            ),
+            "temp_files": [des_path, res_path]
         }
         active_sessions[session_id] = session
 
@@ -148,168 +337,324 @@ def run_interview(session_id, description, resume_data, num_questions=5):
         print("Generating questions using LLM...")
         socketio.emit('interview_status', {'status': 'generating_questions'}, room=session_id)
 
-        questions = generate_custom_questions(
-            number_of_questions=num_questions,
-            description=description,
-            candidate_resume=resume_data,
-            llm_model=llm
-        )
+        cache_key = question_cache.key(description, resume_data)
+        # The cache may read its disk tier, keep that off the loop
+        questions = await interview_runtime.run_blocking(question_cache.get, cache_key, num_questions)
+        if questions is not None:
+            print("Serving questions from the question cache")
+        else:
+            question_metrics = {}
+            questions = await interview_runtime.run_blocking(
+                generate_custom_questions,
+                number_of_questions=num_questions,
+                description=description,
+                candidate_resume=resume_data,
+                llm_model=llm,
+                on_delta=stream_to_room(session_id, 'question_partial', 'questions'),
+                context=description,
+                question_bank=question_bank,
+                strategy=QUESTION_STRATEGY,
+                metrics=question_metrics,
+                course=course,
+                university=university
+            )
+            record_question_metrics(question_metrics)
+            # Only questions the model actually produced go into the pool, not bank or fallback top-ups
+            await interview_runtime.run_blocking(question_cache.put, cache_key, question_metrics.get("generated", []))
 
         session["questions"] = questions
         print(f"Generated {len(questions)} questions")
 
-        # Step 4: Process questions one by one
-        question_index = 0
-        original_questions_asked = 0
+        # Render the first question ahead of the rest, which render while it is answered
+        tts_service.prerender(questions)
 
-        while question_index < len(session["questions"]) and session["active"]:
-            current_question = session["questions"][question_index]
-            session["current_index"] = question_index
-            session["waiting_for_answer"] = True
-            session["answer_received"].clear()
+        # Step 4: Process questions one by one, driven by submitted answers
+        if session["active"] and questions:
+            ask_question(session_id)
+        else:
+            end_interview(session_id)
 
-            print(f"Asking question {question_index + 1}: {current_question}")
+    except Exception as err:
+        print(f"Error in interview session: {err}")
+        import traceback
+        traceback.print_exc()
+        socketio.emit('interview_error', {'error': str(err)}, room=session_id)
+        end_interview(session_id, state="failed")
 
-            # Emit the question to frontend
-            socketio.emit('new_question', {
-                'question': current_question,
-                'question_number': question_index + 1,
-                'total_questions': len(session["questions"])
-            }, room=session_id)
 
-            # Speak the question
-            def speak_async():
-                tts_error = speak_question(current_question)
-                if tts_error:
-                    socketio.emit('tts_error', {'error': tts_error}, room=session_id)
-
-            tts_thread = threading.Thread(target=speak_async)
-            tts_thread.daemon = True
-            tts_thread.start()
-
-            # Wait for answer with longer timeout for recordings
-            print(f"Waiting for answer to question {question_index + 1}...")
-            answer_received = session["answer_received"].wait(timeout=300)
-
-            if not answer_received:
-                print(f"Timeout waiting for answer to question {question_index + 1}")
-                socketio.emit('interview_error', {
-                    'error': f'Timeout waiting for answer to question {question_index + 1}'
-                }, room=session_id)
-                break
-
-            if not session["active"]:
-                print("Session was cancelled")
-                break
-
-            session["waiting_for_answer"] = False
-            print(f"Received answer for question {question_index + 1}")
-
-            # Check if this was an original question (not a follow-up)
-            if question_index < session["original_question_count"]:
-                original_questions_asked += 1
-
-            # Generate follow-up question if enabled and conditions are met
-            should_generate_followup = (
-                    session.get("generate_followup", False) and
-                    original_questions_asked < session["original_question_count"] and
-                    current_question in session["interview_data"] and
-                    session["active"]  # Extra safety check
-            )
+def question_payload(session):
+    """new_question event data for the question the session is currently on"""
+    return {
+        'question': session["questions"][session["current_index"]],
+        'question_number': session["current_index"] + 1,
+        'total_questions': len(session["questions"])
+    }
 
-            if should_generate_followup:
-                try:
-                    print("Generating follow-up question...")
-                    # Emit status to frontend
-                    socketio.emit('interview_status', {'status': 'generating_followup'}, room=session_id)
 
-                    answer = session["interview_data"][current_question]
-                    follow_up = generate_follow_up(
-                        question=current_question,
-                        answer=answer,
-                        model=llm
-                    )
+def discard_live_transcriber(session):
+    """Drop the session's live transcriber, stopping its ffmpeg decoder"""
+    transcriber = session.pop("live_transcriber", None)
+    if transcriber is not None:
+        transcriber.close()
 
-                    # Double-check session is still active before modifying questions
-                    if session["active"] and follow_up and follow_up.strip():
-                        # Insert follow-up after current question
-                        session["questions"].insert(question_index + 1, follow_up)
-                        print(f"Follow-up added. Total questions now: {len(session['questions'])}")
 
-                        # Emit updated question count to frontend
-                        socketio.emit('questions_updated', {
-                            'total_questions': len(session["questions"])
-                        }, room=session_id)
-                    else:
-                        print("Session inactive or empty follow-up, skipping insertion")
+def ask_question(session_id):
+    """Emit the current question and wait for the answer without blocking a thread"""
+    session = active_sessions[session_id]
+    question_index = session["current_index"]
+    current_question = session["questions"][question_index]
+    session["state"] = "awaiting_answer"
+    session["waiting_for_answer"] = True
+    discard_live_transcriber(session)
 
-                except Exception as e:
-                    print(f"Error generating follow-up: {e}")
-                    # Don't break the interview, just continue without follow-up
-                    import traceback
-                    traceback.print_exc()
+    print(f"Asking question {question_index + 1}: {current_question}")
 
-            question_index += 1
+    # Emit the question to frontend
+    socketio.emit('new_question', question_payload(session), room=session_id)
 
-        # Step 5: Analyze if interview completed successfully
-        if session["active"] and len(session["interview_data"]) > 0:
-            print("Starting analysis...")
-            socketio.emit('interview_status', {'status': 'analyzing_responses'}, room=session_id)
+    # Speak the question, immediately when its audio was pre-rendered
+    cached_audio = tts_service.get_cached(current_question)
+    if cached_audio is not None:
+        send_question_audio(session_id, current_question, question_index + 1, cached_audio)
+    else:
+        interview_runtime.run_blocking(send_question_audio, session_id, current_question, question_index + 1)
 
-            try:
-                print("Calling the analysis function!")
-                strengths_weaknesses_analysis = analyze_strengths_and_weaknesses(
-                    interview_data=session["interview_data"],
-                    llm_model=llm
-                )
-                print("Analysis Complete!")
+    # Arm the answer timeout for recordings
+    print(f"Waiting for answer to question {question_index + 1}...")
+    session["answer_timeout"] = interview_runtime.call_later(
+        ANSWER_TIMEOUT_SECONDS, on_answer_timeout, session_id, question_index
+    )
 
-                session["analysis"] = strengths_weaknesses_analysis
-                session["completed"] = True
 
-                # Update portfolio
-                updated_portfolio = resume_data.copy()
-                if "strengths_weaknesses" not in updated_portfolio:
-                    updated_portfolio["strengths_weaknesses"] = {}
+def followup_wanted(session, question_index):
+    """Whether answering the question at question_index should produce a follow-up"""
+    asked = session["original_questions_asked"]
+    if question_index < session["original_question_count"]:
+        asked += 1
+    return (
+            session.get("generate_followup", False) and
+            asked < session["original_question_count"] and
+            session["active"]
+    )
 
-                updated_portfolio["strengths_weaknesses"] = strengths_weaknesses_analysis
-                session["updated_portfolio"] = updated_portfolio
 
-                print("Emitting interview_complete event...")
-                # Send completion notification
-                socketio.emit('interview_complete', {
-                    'analysis': strengths_weaknesses_analysis,
-                    'updated_portfolio': updated_portfolio
-                }, room=session_id)
+def on_answer_timeout(session_id, question_index):
+    """Give up on a session whose candidate never answered"""
+    session = active_sessions.get(session_id)
+    if (session is None or session["state"] != "awaiting_answer"
+            or session["current_index"] != question_index):
+        return
+
+    print(f"Timeout waiting for answer to question {question_index + 1}")
+    socketio.emit('interview_error', {
+        'error': f'Timeout waiting for answer to question {question_index + 1}'
+    }, room=session_id)
+    end_interview(session_id, state="timed_out")
+
+
+async def advance_interview(session_id):
+    """Handle a stored answer: optionally add a follow-up, then ask the next question or analyze"""
+    session = active_sessions.get(session_id)
+    if session is None:
+        return
+    tracer.bind(session_id=session_id)
+
+    try:
+        timeout = session.pop("answer_timeout", None)
+        if timeout is not None:
+            timeout.cancel()
+
+        if not session["active"]:
+            print("Session was cancelled")
+            end_interview(session_id)
+            return
+
+        question_index = session["current_index"]
+        current_question = session["questions"][question_index]
+        session["waiting_for_answer"] = False
+        print(f"Received answer for question {question_index + 1}")
+
+        # Generate follow-up question if enabled and conditions are met
+        should_generate_followup = (
+                followup_wanted(session, question_index) and
+                current_question in session["interview_data"]
+        )
+
+        # Check if this was an original question (not a follow-up)
+        if question_index < session["original_question_count"]:
+            session["original_questions_asked"] += 1
 
-                print("Interview analysis completed successfully")
+        if not should_generate_followup:
+            session["followup_speculator"].cancel()
+        else:
+            try:
+                print("Generating follow-up question...")
+                session["state"] = "generating_followup"
+                # Emit status to frontend
+                socketio.emit('interview_status', {'status': 'generating_followup'}, room=session_id)
+
+                answer = session["interview_data"][current_question]
+                speculative = session["followup_speculator"].take(question_index, answer)
+                if speculative is not None:
+                    # Already generated in the background while the answer was confirmed
+                    with tracer.span("followup_wait", speculative=True):
+                        follow_up = await asyncio.wrap_future(speculative)
+                else:
+                    follow_up = await interview_runtime.run_blocking(
+                        generate_follow_up,
+                        question=current_question,
+                        answer=answer,
+                        model=get_llm()["engine"],
+                        on_delta=stream_to_room(session_id, 'question_partial', 'followup'),
+                        context=session["description"]
+                    )
+
+                # Double-check session is still active before modifying questions
+                if session["active"] and follow_up and follow_up.strip():
+                    # Insert follow-up after current question
+                    session["questions"].insert(question_index + 1, follow_up)
+                    tts_service.prerender([follow_up])
+                    print(f"Follow-up added. Total questions now: {len(session['questions'])}")
+
+                    # Emit updated question count to frontend
+                    socketio.emit('questions_updated', {
+                        'total_questions': len(session["questions"])
+                    }, room=session_id)
+                else:
+                    print("Session inactive or empty follow-up, skipping insertion")
 
             except Exception as e:
-                print(f"Error in analysis: {e}")
+                print(f"Error generating follow-up: {e}")
+                # Don't break the interview, just continue without follow-up
                 import traceback
                 traceback.print_exc()
-                socketio.emit('interview_error', {'error': f'Analysis failed: {str(e)}'}, room=session_id)
 
-        # Cleanup temporary files
-        try:
-            os.unlink(des_path)
-            os.unlink(res_path)
-            print("Temporary files cleaned up")
-        except Exception as cleanup_err:
-            print(f"Cleanup Error: {cleanup_err}")
-            pass
+        session["current_index"] = question_index + 1
+        if session["active"] and session["current_index"] < len(session["questions"]):
+            ask_question(session_id)
+            return
+
+        # Step 5: Analyze if interview completed successfully
+        await finish_interview(session_id)
 
     except Exception as err:
         print(f"Error in interview session: {err}")
         import traceback
         traceback.print_exc()
         socketio.emit('interview_error', {'error': str(err)}, room=session_id)
+        end_interview(session_id, state="failed")
+
+
+def exceeds_analysis_budget(interview_data):
+    """Whether the Q/A text is too long to analyze in a single prompt"""
+    interview_text = "".join(f"Q: {question}\nA: {answer}\n\n" for question, answer in interview_data.items())
+    return get_llm()["backend"].count_tokens(interview_text) > ANALYSIS_CHUNK_TOKENS
+
+
+async def finish_interview(session_id):
+    """Analyze the collected answers and publish the report"""
+    session = active_sessions[session_id]
+    tracer.bind(session_id=session_id)
+
+    if session["active"] and len(session["interview_data"]) > 0:
+        print("Starting analysis...")
+        session["state"] = "analyzing"
+        socketio.emit('interview_status', {'status': 'analyzing_responses'}, room=session_id)
+
+        try:
+            print("Calling the analysis function!")
+            if ANALYSIS_MODE == "incremental":
+                # Answers were scored as they came in, only the merge step is left
+                strengths_weaknesses_analysis = await interview_runtime.run_blocking(
+                    session["incremental_analyzer"].finish,
+                    session["interview_data"],
+                    on_delta=stream_to_room(session_id, 'analysis_partial', 'analysis')
+                )
+            elif ANALYSIS_MODE == "map_reduce" or await interview_runtime.run_blocking(
+                    exceeds_analysis_budget, session["interview_data"]):
+                # Too long for one prompt in the fine-tuned context window
+                llm = await interview_runtime.run_blocking(get_llm)
+                strengths_weaknesses_analysis = await interview_runtime.run_blocking(
+                    analyze_map_reduce,
+                    session["interview_data"],
+                    llm["engine"],
+                    token_budget=ANALYSIS_CHUNK_TOKENS,
+                    count_tokens=llm["backend"].count_tokens,
+                    on_delta=stream_to_room(session_id, 'analysis_partial', 'analysis'),
+                    context=session["description"]
+                )
+            else:
+                strengths_weaknesses_analysis = await interview_runtime.run_blocking(
+                    analyze_strengths_and_weaknesses,
+                    interview_data=session["interview_data"],
+                    llm_model=(await interview_runtime.run_blocking(get_llm))["engine"],
+                    on_delta=stream_to_room(session_id, 'analysis_partial', 'analysis'),
+                    context=session["description"]
+                )
+            print("Analysis Complete!")
 
-    finally:
-        # Session cleanup
-        if session_id in active_sessions:
-            active_sessions[session_id]["active"] = False
-        print(f"Interview session {session_id} ended")
+            session["analysis"] = strengths_weaknesses_analysis
+            session["completed"] = True
+
+            # Update portfolio
+            updated_portfolio = session["resume_data"].copy()
+            if "strengths_weaknesses" not in updated_portfolio:
+                updated_portfolio["strengths_weaknesses"] = {}
+
+            updated_portfolio["strengths_weaknesses"] = strengths_weaknesses_analysis
+            session["updated_portfolio"] = updated_portfolio
+
+            print("Emitting interview_complete event...")
+            # Send completion notification
+            socketio.emit('interview_complete', {
+                'analysis': strengths_weaknesses_analysis,
+                'updated_portfolio': updated_portfolio
+            }, room=session_id)
+
+            print("Interview analysis completed successfully")
+
+        except Exception as e:
+            print(f"Error in analysis: {e}")
+            import traceback
+            traceback.print_exc()
+            socketio.emit('interview_error', {'error': f'Analysis failed: {str(e)}'}, room=session_id)
+
+    end_interview(session_id)
+
+
+def end_interview(session_id, state=None):
+    """Release the timer and temporary files of a session that can make no further progress"""
+    session = active_sessions.get(session_id)
+    if session is None:
+        return
+
+    timeout = session.pop("answer_timeout", None)
+    if timeout is not None:
+        timeout.cancel()
+    if session.get("followup_speculator") is not None:
+        session["followup_speculator"].cancel()
+    discard_live_transcriber(session)
+
+    # Cleanup temporary files
+    temp_files = session.pop("temp_files", [])
+    try:
+        for path in temp_files:
+            os.unlink(path)
+        if temp_files:
+            print("Temporary files cleaned up")
+    except Exception as cleanup_err:
+        print(f"Cleanup Error: {cleanup_err}")
+
+    # Session cleanup
+    session["active"] = False
+    session["waiting_for_answer"] = False
+    if state:
+        session["state"] = state
+    elif session.get("state") not in ("cancelled", "failed", "timed_out"):
+        session["state"] = "completed" if session["completed"] else "ended"
+    # Re-measuring and the archive writes of evicted sessions are blocking, keep them off the loop
+    interview_runtime.submit_blocking(active_sessions.touch, session_id)
+    print(f"Interview session {session_id} ended")
 
 
 @app.route('/api/')
@@ -320,7 +665,9 @@ def app_client():
 @app.route('/api/start-interview', methods=['POST'])
 def start_interview():
     # Generate a unique session ID
-    session_id = f"session_{uuid.uuid4().hex[:8]}_{int(time.time())}"
+    # Under the pre-fork server the id carries the owning worker so the router can find it
+    worker = f"{worker_tag(WORKER_INDEX)}_" if WORKER_INDEX is not None else ""
+    session_id = f"session_{worker}{uuid.uuid4().hex[:8]}_{int(time.time())}"
 
     # Extract form data
     embassy = request.form.get("embassy_or_consulate", "").strip()
@@ -380,15 +727,29 @@ def start_interview():
     except ValueError:
         num_questions = 3
 
+    # The server accepts connections while models warm up, interviews have to wait;
+    # a launcher that never called warm_up() starts it here
+    warm_up()
+    if not model_loader.ready():
+        return jsonify({
+            "mtype": "error",
+            "message": "Models are still loading, please try again shortly",
+            "loading": model_loader.status()
+        }), 503
+
+    # Make room by evicting finished sessions, refuse when only live ones remain
+    active_sessions.evict()
+    if len(active_sessions) >= active_sessions.max_sessions:
+        return jsonify({
+            "mtype": "error",
+            "message": "Too many interviews in progress, please try again shortly"
+        }), 503
+
     print(f"Starting interview session {session_id} with {num_questions} questions")
 
-    # Start interview in background thread
-    thread = threading.Thread(
-        target=run_interview,
-        args=(session_id, filled_prompt, resume_data, num_questions)
-    )
-    thread.daemon = True
-    thread.start()
+    # Start interview on the shared runtime
+    interview_runtime.submit(run_interview(session_id, filled_prompt, resume_data, num_questions,
+                                           course=course, university=university))
 
     return jsonify({
         "mtype": "success",
@@ -414,20 +775,79 @@ def handle_join(data):
     emit('joined_session', {'session_id': session_id})
     print(f"Client joined session: {session_id}")
 
+    # A question asked before the browser joined (cached questions are asked almost
+    # immediately) was emitted to an empty room, send it again to this client
+    session = active_sessions.get(session_id)
+    if session is not None and session.get("state") == "awaiting_answer":
+        payload = question_payload(session)
+        emit('new_question', payload)
+        interview_runtime.submit_blocking(
+            send_question_audio, session_id, payload['question'], payload['question_number'],
+            tts_service.get_cached(payload['question'])
+        )
+
+
+def transcribe_answer(audio, **kwargs):
+    """Transcribe 16 kHz answer audio with the shared Whisper model"""
+    if WHISPER_VAD:
+        return whisper_batcher.transcribe_speech(audio, split=WHISPER_VAD_SPLIT, **kwargs)
+    return whisper_batcher.transcribe(audio, **kwargs)
+
+
+@socketio.on('answer_audio_chunk')
+def handle_audio_chunk(data):
+    """Collect audio while the candidate speaks and emit partial transcriptions"""
+    session_id = data.get('session_id')
+    session = active_sessions.get(session_id) if session_id else None
+    chunk = data.get('chunk')
+    if session is None or not chunk or not session["active"] or session.get("state") != "awaiting_answer":
+        return
+    tracer.bind(session_id=session_id)
+
+    transcriber = session.get("live_transcriber")
+    if transcriber is None or transcriber.question_index != session["current_index"]:
+        discard_live_transcriber(session)
+        transcriber = LiveTranscriber(transcribe_answer, session["current_index"])
+        session["live_transcriber"] = transcriber
+
+    if transcriber.add_chunk(chunk):
+        # Keep the Socket.IO handler free while Whisper runs, update() skips if one is in flight
+        interview_runtime.submit_blocking(update_live_transcription, session_id, session, transcriber)
+
+
+def update_live_transcription(session_id, session, transcriber):
+    """Transcribe the uncommitted part of a streaming answer and push the partial text"""
+    try:
+        partial = transcriber.update()
+    except Exception as e:
+        # Partial results are best effort, the final submission still transcribes everything left
+        print(f"Error in live transcription: {e}")
+        return
+
+    if partial:
+        socketio.emit('transcription_result', {'transcription': partial, 'partial': True}, room=session_id)
+
+    # Start drafting the follow-up from the part of the answer that is already stable
+    question_index = transcriber.question_index
+    if followup_wanted(session, question_index) and transcriber.committed_text:
+        session["followup_speculator"].speculate(
+            question_index, session["questions"][question_index], transcriber.committed_text
+        )
+
 
 @socketio.on('submit_answer')
 def handle_answer(data):
     session_id = data.get('session_id')
-    if not session_id or session_id not in active_sessions:
+    session = active_sessions.get(session_id) if session_id else None
+    if session is None:
         emit('error', {'message': 'Invalid session ID'})
         return
 
-    session = active_sessions[session_id]
     if not session["active"]:
         emit('error', {'message': 'Session is not active'})
         return
 
-    if not session["waiting_for_answer"]:
+    if not session["waiting_for_answer"] or session.get("state") != "awaiting_answer":
         emit('error', {'message': 'Not waiting for an answer'})
         return
 
@@ -438,35 +858,60 @@ def handle_answer(data):
     current_question = session["questions"][session["current_index"]]
     answer_text = data.get('text', '').strip()
     audio_data = data.get('audio')
+    final_chunk = data.get('final_chunk')
+    transcriber = session.get("live_transcriber")
+    streamed = bool(data.get('streamed')) and not audio_data
+    if streamed and not data.get('chunk_count'):
+        # Nothing was streamed before the recording stopped, the final chunk is the whole answer
+        audio_data, final_chunk, streamed = final_chunk, None, False
+    elif streamed and (transcriber is None or transcriber.question_index != session["current_index"]
+                       or transcriber.chunk_count != data['chunk_count']):
+        # Some chunks never reached the transcriber, ask the client for the whole recording
+        discard_live_transcriber(session)
+        emit('audio_resend', {'reason': 'incomplete audio stream'})
+        return
     answer = ""
+    tracer.bind(session_id=session_id)
+    uploaded = audio_data or final_chunk
+    if uploaded and data.get('sent_at'):
+        # Client clock, only meaningful when client and server clocks roughly agree
+        tracer.record("upload", max(time.time() - data['sent_at'] / 1000.0, 0.0), bytes=len(uploaded))
 
     print(f"Processing answer for question {session['current_index'] + 1}")
 
     # Process audio if provided
-    if audio_data:
-        temp_audio_path = None
+    if streamed or audio_data:
         try:
             # Emit processing status
             emit('audio_processing', {'status': 'processing'})
-            # Decode and save audio
-            audio_bytes = base64.b64decode(audio_data)
-            temp_filename = f"temp_audio_{uuid.uuid4().hex}.wav"
-            temp_audio_path = os.path.join(TEMP_DIR, temp_filename)
-
-            with open(temp_audio_path, 'wb') as temp_file:
-                temp_file.write(audio_bytes)
-
-            print(f"Audio saved to: {temp_audio_path}")
-
-            # Verify file
-            if not os.path.exists(temp_audio_path) or os.path.getsize(temp_audio_path) == 0:
-                raise ValueError("Audio file is empty or not created")
-
-            # Transcribe with Whisper
-            print("Starting transcription...")
-            model = whisper.load_model("base")
-            result = model.transcribe(temp_audio_path, fp16=False)
-            answer = result["text"].strip()
+            if streamed:
+                if final_chunk:
+                    transcriber.add_chunk(final_chunk)
+                # Most of the answer was transcribed while it was recorded, only the tail is left
+                print(f"Finishing live transcription after {transcriber.updates} partial updates...")
+                with tracer.span("transcription", streamed=True, partial_updates=transcriber.updates):
+                    answer = transcriber.finish()
+            else:
+                # Binary attachments arrive as bytes, older clients still send base64 text
+                if isinstance(audio_data, (bytes, bytearray, memoryview)):
+                    audio_bytes = audio_data
+                else:
+                    with tracer.span("base64_decode", chars=len(audio_data)):
+                        audio_bytes = base64.b64decode(audio_data)
+                # Decode in memory to 16 kHz float32, no temp file round trip
+                with tracer.span("audio_decode", bytes=len(audio_bytes)) as span:
+                    audio = decode_audio_bytes(audio_bytes)
+                    span.tag(audio_seconds=audio.size / WHISPER_SAMPLE_RATE)
+                if audio.size == 0:
+                    raise ValueError("Audio is empty after decoding")
+
+                print(f"Audio decoded: {audio.size / WHISPER_SAMPLE_RATE:.1f}s")
+
+                # Transcribe with Whisper
+                print("Starting transcription...")
+                with tracer.span("transcription", streamed=False, audio_seconds=audio.size / WHISPER_SAMPLE_RATE):
+                    answer = transcribe_answer(audio)["text"].strip()
+            discard_live_transcriber(session)
 
             print(f"Transcription successful: {answer}")
             emit('transcription_result', {'transcription': answer})
@@ -475,15 +920,6 @@ def handle_answer(data):
             print(f"Error processing audio: {e}")
             emit('transcription_error', {'error': str(e)})
             answer = answer_text or "Unable to process audio response"
-
-        finally:
-            # Cleanup temp file
-            if temp_audio_path and os.path.exists(temp_audio_path):
-                try:
-                    os.unlink(temp_audio_path)
-                    print("Temporary audio file cleaned up")
-                except Exception as cleanup_error:
-                    print(f"Cleanup error: {cleanup_error}")
     else:
         # Use text answer
         answer = answer_text
@@ -492,10 +928,28 @@ def handle_answer(data):
         emit('error', {'message': 'No answer provided'})
         return
 
+    # Guard against a second submission while this one was being transcribed
+    if session.get("state") != "awaiting_answer":
+        emit('error', {'message': 'Not waiting for an answer'})
+        return
+
     # Store the answer
+    session["state"] = "answer_received"
     session["interview_data"][current_question] = answer
     session["generate_followup"] = data.get("generateFollowUp", True)
 
+    # Score this answer in the background while the interview continues
+    if ANALYSIS_MODE == "incremental":
+        session["incremental_analyzer"].add(current_question, answer)
+
+    # Generate the follow-up in the background while the confirmation goes out
+    if followup_wanted(session, session["current_index"]):
+        session["followup_speculator"].speculate(session["current_index"], current_question, answer, final=True)
+    else:
+        session["followup_speculator"].cancel()
+
+    active_sessions.touch(session_id)
+
     print(f"Answer stored for question {session['current_index'] + 1}: {answer[:100]}...")
 
     # Send confirmation to client FIRST
@@ -508,8 +962,8 @@ def handle_answer(data):
         'current_question_number': session['current_index'] + 1
     })
 
-    # THEN signal that answer was received (this will trigger next question)
-    session["answer_received"].set()
+    # THEN advance the interview (this will trigger next question)
+    interview_runtime.submit(advance_interview(session_id))
 
 
 @socketio.on('cancel_interview')
@@ -517,7 +971,8 @@ def handle_cancel(data):
     session_id = data.get('session_id')
     if session_id and session_id in active_sessions:
         active_sessions[session_id]["active"] = False
-        active_sessions[session_id]["answer_received"].set()  # Unblock waiting thread
+        active_sessions[session_id]["state"] = "cancelled"
+        interview_runtime.call_soon(end_interview, session_id)  # Release timer and files
         emit('interview_cancelled', {}, room=session_id)
         print(f"Interview session {session_id} cancelled")
 
@@ -542,21 +997,31 @@ def handle_heartbeat(data):
 @app.route('/api/get-analysis', methods=['GET'])
 def get_analysis():
     session_id = request.args.get('session_id')
-    if not session_id or session_id not in active_sessions:
+    session = active_sessions.get(session_id) if session_id else None
+    if session is None:
+        # Completed sessions may have been evicted to the archive
+        archived = load_archived_session(session_id)
+        if archived is not None:
+            return jsonify({
+                "mtype": "success",
+                "analysis": archived["analysis"],
+                "updated_portfolio": archived["updated_portfolio"]
+            })
         return jsonify({
             "mtype": "error",
             "message": "Invalid Session ID"
         }), 400
 
-    session = active_sessions[session_id]
-
     print(f"Analysis request for session {session_id}: completed={session.get('completed', False)}")
 
     if not session.get("completed", False):
+        # Answers are scored as they come in, show what is known so far
+        analyzer = session.get("incremental_analyzer")
         return jsonify({
             "mtype": "warning",
             "message": "Analysis not yet complete",
-            "status": "analyzing" if session.get("active", False) else "inactive"
+            "status": "analyzing" if session.get("active", False) else "inactive",
+            "partial_analysis": analyzer.partial() if analyzer is not None else None
         })
 
     return jsonify({
@@ -566,5 +1031,60 @@ def get_analysis():
     })
 
 
+@app.route('/api/llm-stats', methods=['GET'])
+def llm_stats():
+    llm = get_llm() if model_loader.is_ready("llm") else None
+    return jsonify({
+        "mtype": "success",
+        "backend": llm["backend"].info() if llm else None,
+        "scheduler": dict(llm["scheduler"].stats) if llm and llm["scheduler"] else None,
+        "prefix_cache": prefix_cache.stats(),
+        "runtime": dict(interview_runtime.stats, active_tasks=interview_runtime.active_tasks()),
+        "sessions": active_sessions.stats(),
+        "tts": tts_service.cache_stats(),
+        "question_cache": question_cache.cache_stats(),
+        "question_strategies": question_strategy_stats
+    })
+
+
+@app.route('/api/whisper-stats', methods=['GET'])
+def whisper_stats():
+    return jsonify({
+        "mtype": "success",
+        "models": whisper_registry.stats(),
+        "batching": dict(whisper_batcher.stats)
+    })
+
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    # Readiness probe: 200 once every model is loaded, 503 with loading progress until then
+    status = model_loader.status()
+    return jsonify(dict(status, mtype="success" if status["ready"] else "loading")), 200 if status["ready"] else 503
+
+
+@app.route('/api/trace-stats', methods=['GET'])
+def trace_stats():
+    # Per-stage latency histograms; ?session_id= adds that session's recent spans
+    session_id = request.args.get('session_id')
+    return jsonify({
+        "mtype": "success",
+        "stages": tracer.stats(),
+        "recent": tracer.recent(session_id=session_id) if session_id else []
+    })
+
+
 if __name__ == '__main__':
-    socketio.run(app=app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if SERVER_WORKERS > 1:
+        PreforkServer(
+            run_worker,
+            workers=SERVER_WORKERS,
+            port=5000,
+            base_port=PREFORK_BASE_PORT,
+            before_fork=load_models_before_fork
+        ).serve_forever()
+    warm_up()
+    if MODEL_WARMUP != "background":
+        model_loader.wait()
+    # The reloader would import app a second time in a child and load every model again
+    socketio.run(app=app, debug=True, use_reloader=False, host='0.0.0.0', port=5000)
\ No newline at end of file
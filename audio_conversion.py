@@ -1,6 +1,14 @@
-import speech_recognition as sr
+import io
+import subprocess
+import threading
+import wave
+from functools import lru_cache
+from math import gcd
 import numpy as np
-import torch
+from numpy.lib.stride_tricks import as_strided
+
+# Sample rate Whisper expects
+WHISPER_SAMPLE_RATE = 16000
 
 
 def audio_to_numpy(audio_data):
@@ -10,24 +18,319 @@ def audio_to_numpy(audio_data):
     audio_np = audio_np.astype(np.float32) / 32768.0  # Normalize audio
     return audio_np
 
+@lru_cache(maxsize=16)
+def _polyphase_filter(up, down, half_width=10, kaiser_beta=5.0):
+    """Kaiser-windowed sinc low-pass for an up/down rate pair, split into its polyphase bank.
+
+    Row r holds the taps that output phase r uses, stored oldest input first so a
+    window of consecutive input samples can be dotted with it directly.
+    """
+    factor = max(up, down)
+    half = half_width * factor
+    n = np.arange(2 * half + 1) - half
+    taps = np.sinc(n / factor) * np.kaiser(2 * half + 1, kaiser_beta)
+    taps *= up / taps.sum()  # Unity DC gain after zero-stuffing by up
+
+    taps_per_phase = -(-taps.size // up)
+    padded = np.zeros(taps_per_phase * up)
+    padded[:taps.size] = taps
+    bank = padded.reshape(taps_per_phase, up).T[:, ::-1]
+    return np.ascontiguousarray(bank, dtype=np.float32), half
+
+def _polyphase_outputs(buffer, buffer_start, n_start, n_count, up, down, bank, half):
+    """Output samples n_start .. n_start + n_count - 1; buffer[i] holds input sample buffer_start + i."""
+    out = np.empty(n_count, dtype=np.float32)
+    taps_per_phase = bank.shape[1]
+    for phase in range(min(up, n_count)):
+        # Outputs phase, phase + up, ... use the same filter row and step down input samples apart
+        position = (n_start + phase) * down + half
+        first = position // up - (taps_per_phase - 1) - buffer_start
+        count = -(-(n_count - phase) // up)
+        windows = as_strided(buffer[first:], shape=(count, taps_per_phase),
+                             strides=(down * buffer.itemsize, buffer.itemsize), writeable=False)
+        out[phase::up] = windows @ bank[position % up]
+    return out
+
+def _rate_pair(original_rate, target_rate):
+    divisor = gcd(int(original_rate), int(target_rate))
+    return int(target_rate) // divisor, int(original_rate) // divisor
+
 def resample_audio(audio_np, original_rate=44100, target_rate=16000):
-    """Resample the audio numpy array to the target rate."""
-    audio_tensor = torch.from_numpy(audio_np).unsqueeze(0).unsqueeze(0)  # Shape (1, 1, length)
-    resampled_audio = torch.nn.functional.interpolate(audio_tensor, scale_factor=target_rate/original_rate, mode='linear', align_corners=False)
-    return resampled_audio.squeeze().numpy()
-
-def speech_to_text(model):
-    """Transcribe speech to text using Whisper model."""
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("Listening for your answer...")
-        audio_data = recognizer.listen(source)
+    """Resample the audio numpy array to the target rate with a rational polyphase filter."""
+    audio_np = np.asarray(audio_np, dtype=np.float32).reshape(-1)
+    if original_rate == target_rate or audio_np.size == 0:
+        return audio_np
+    up, down = _rate_pair(original_rate, target_rate)
+    bank, half = _polyphase_filter(up, down)
+    history = bank.shape[1] - 1
+
+    n_out = -(-audio_np.size * up // down)
+    last_input = ((n_out - 1) * down + half) // up
+    # Zero history before the first sample and zeros past the last one, the only copy made
+    buffer = np.zeros(history + max(audio_np.size, last_input + 1), dtype=np.float32)
+    buffer[history:history + audio_np.size] = audio_np
+    return _polyphase_outputs(buffer, -history, 0, n_out, up, down, bank, half)
+
+class StreamingResampler:
+    """Polyphase resampling of audio arriving in chunks, carrying filter state between them.
+
+    Concatenating the outputs of process() for every chunk and then flush() gives
+    the same samples as resample_audio on the whole recording.
+    """
+
+    def __init__(self, original_rate=44100, target_rate=WHISPER_SAMPLE_RATE):
+        self.up, self.down = _rate_pair(original_rate, target_rate)
+        self.bank, self.half = _polyphase_filter(self.up, self.down)
+        history = self.bank.shape[1] - 1
+        self._buffer = np.zeros(history, dtype=np.float32)
+        self._buffer_start = -history
+        self.received = 0
+        self.produced = 0
+
+    def _emit(self, n_end):
+        count = n_end - self.produced
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32)
+        out = _polyphase_outputs(self._buffer, self._buffer_start, self.produced, count,
+                                 self.up, self.down, self.bank, self.half)
+        self.produced = n_end
+        # Keep only the input the next output still reaches back to
+        first_needed = (self.produced * self.down + self.half) // self.up - (self.bank.shape[1] - 1)
+        drop = first_needed - self._buffer_start
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._buffer_start += drop
+        return out
+
+    def process(self, chunk):
+        """Feed input samples, return every output sample they complete."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        self._buffer = np.concatenate((self._buffer, chunk))
+        self.received += chunk.size
+        # Output n is complete once input (n * down + half) // up has arrived
+        return self._emit((self.received * self.up - 1 - self.half) // self.down + 1)
+
+    def flush(self):
+        """Return the remaining output, treating the input after the last chunk as silence."""
+        n_out = -(-self.received * self.up // self.down)
+        last_input = ((n_out - 1) * self.down + self.half) // self.up
+        padding = last_input + 1 - (self._buffer_start + self._buffer.size)
+        if padding > 0:
+            self._buffer = np.concatenate((self._buffer, np.zeros(padding, dtype=np.float32)))
+        return self._emit(n_out)
+
+def pcm_to_numpy(pcm_bytes, sample_width=2, channels=1):
+    """Convert interleaved little-endian PCM bytes to a mono float32 array in [-1, 1]."""
+    if sample_width == 1:
+        audio_np = (np.frombuffer(pcm_bytes, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        audio_np = np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        audio_np = np.frombuffer(pcm_bytes, dtype=np.int32).astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported PCM sample width: {sample_width}")
+
+    if channels > 1:
+        audio_np = audio_np[:len(audio_np) - len(audio_np) % channels].reshape(-1, channels).mean(axis=1)
+    return audio_np
+
+def decode_wav_bytes(audio_bytes, target_rate=WHISPER_SAMPLE_RATE):
+    """Decode an in-memory PCM WAV file without touching disk or ffmpeg."""
+    with wave.open(io.BytesIO(audio_bytes), 'rb') as wav_file:
+        if wav_file.getcomptype() != 'NONE':
+            raise ValueError("Compressed WAV is not supported by the fast path")
+        frames = wav_file.readframes(wav_file.getnframes())
+        audio_np = pcm_to_numpy(frames, wav_file.getsampwidth(), wav_file.getnchannels())
+        rate = wav_file.getframerate()
+
+    if rate != target_rate:
+        audio_np = resample_audio(audio_np, original_rate=rate, target_rate=target_rate)
+    return audio_np.astype(np.float32, copy=False)
+
+def decode_audio_bytes(audio_bytes, target_rate=WHISPER_SAMPLE_RATE):
+    """Decode uploaded audio (webm, ogg, wav, ...) to a mono float32 array at target_rate.
+
+    PCM WAV is parsed directly, anything else is piped through ffmpeg via stdin/stdout.
+    """
+    audio_bytes = bytes(audio_bytes)
+    if not audio_bytes:
+        raise ValueError("Audio data is empty")
+
+    if audio_bytes[:4] == b'RIFF' and audio_bytes[8:12] == b'WAVE':
+        try:
+            return decode_wav_bytes(audio_bytes, target_rate)
+        except (wave.Error, ValueError, EOFError):
+            pass  # Fall back to ffmpeg for WAV variants the wave module can't read
 
-    audio_np = audio_to_numpy(audio_data)  # Convert audio to numpy array
-    audio_np = audio_np.flatten()  # Flatten numpy array
-    resampled_audio = resample_audio(audio_np)  # Resample audio to 16000 Hz
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(target_rate),
+        "pipe:1"
+    ]
+    try:
+        out = subprocess.run(cmd, input=audio_bytes, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    return pcm_to_numpy(out)
+
+class StreamingAudioDecoder:
+    """Decode a growing compressed recording (MediaRecorder chunks) through one ffmpeg process.
+
+    Chunks are written to ffmpeg's stdin as they arrive and a reader thread collects
+    the PCM it produces, so each chunk is decoded once instead of re-decoding the
+    whole recording on every partial update.
+    """
+
+    def __init__(self, target_rate=WHISPER_SAMPLE_RATE):
+        cmd = [
+            "ffmpeg", "-nostdin", "-loglevel", "error",
+            # Start decoding from the first bytes instead of buffering input to probe it
+            "-probesize", "32768", "-analyzeduration", "0", "-fflags", "nobuffer",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(target_rate),
+            "pipe:1"
+        ]
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL)
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="ffmpeg-decoder")
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _read(self):
+        while True:
+            data = self._process.stdout.read1(65536)
+            if not data:
+                break
+            with self._lock:
+                self._pcm += data
+
+    def feed(self, chunk):
+        try:
+            self._process.stdin.write(chunk)
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            raise RuntimeError("ffmpeg stopped decoding the recording") from e
+
+    def buffered_bytes(self):
+        """Size of the PCM decoded so far"""
+        with self._lock:
+            return len(self._pcm)
+
+    def audio(self):
+        """Everything decoded so far as float32"""
+        with self._lock:
+            # Whole samples only, the reader may be midway through one
+            pcm = bytes(self._pcm[:len(self._pcm) - len(self._pcm) % 2])
+        return pcm_to_numpy(pcm)
+
+    def close(self):
+        """Finish the stream and return the whole decoded recording"""
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._reader.join()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"Failed to decode audio: ffmpeg exited with code {self._process.returncode}")
+        return self.audio()
+
+    def abort(self):
+        self._process.kill()
+        self._process.wait()
+
+def frame_energy_zcr(audio_np, frame_length):
+    """Per-frame energy in dBFS and zero-crossing rate of a float32 array in [-1, 1]."""
+    num_frames = audio_np.size // frame_length
+    frames = audio_np[:num_frames * frame_length].reshape(num_frames, frame_length)  # View, no copy
+    energy_db = 10.0 * np.log10(np.einsum('ij,ij->i', frames, frames) / frame_length + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+    return energy_db, zcr
+
+def speech_regions(audio_np, sample_rate=WHISPER_SAMPLE_RATE, frame_ms=30, margin_db=12.0, floor_db=-45.0,
+                   zcr_threshold=0.25, min_speech_ms=120, max_gap_ms=400, pad_ms=150):
+    """Sample ranges [(start, end)] that contain speech, using frame energy and zero crossings.
+
+    Frames are speech when they rise margin_db above the clip's noise floor (10th
+    percentile of frame energy) and floor_db, or are somewhat quieter but cross zero often, which
+    keeps unvoiced consonants like "s" and "f". Gaps shorter than max_gap_ms are
+    bridged, blips shorter than min_speech_ms dropped, and each region padded.
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    if audio_np.size < frame_length:
+        return []
+
+    energy_db, zcr = frame_energy_zcr(audio_np, frame_length)
+    threshold = max(np.percentile(energy_db, 10) + margin_db, floor_db)
+    if energy_db.max() <= threshold:
+        # No quiet stretch to measure a noise floor against: all speech, or all silence below floor_db
+        threshold = floor_db
+    voiced = energy_db > threshold
+    unvoiced = (energy_db > max(threshold - margin_db / 2, floor_db)) & (zcr > zcr_threshold)
+    speech = np.concatenate(([False], voiced | unvoiced, [False]))
+    edges = np.flatnonzero(speech[1:] != speech[:-1])
+
+    regions = []
+    for start, end in zip(edges[0::2], edges[1::2]):
+        if regions and (start - regions[-1][1]) * frame_ms <= max_gap_ms:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    pad = int(sample_rate * pad_ms / 1000)
+    return [
+        (max(int(start) * frame_length - pad, 0), min(int(end) * frame_length + pad, audio_np.size))
+        for start, end in regions
+        if (end - start) * frame_ms >= min_speech_ms
+    ]
+
+def trim_silence(audio_np, **vad_options):
+    """Drop leading and trailing silence; returns (view of the speech, offset in samples)."""
+    regions = speech_regions(audio_np, **vad_options)
+    if not regions:
+        return audio_np[:0], 0
+    return audio_np[regions[0][0]:regions[-1][1]], regions[0][0]
+
+def pack_speech(regions, max_samples):
+    """Group speech regions into (start, end) chunks no longer than max_samples, cutting at silences."""
+    chunks = []
+    for start, end in regions:
+        # One stretch of speech longer than a chunk is cut where it must be
+        while end - start > max_samples:
+            chunks.append((start, start + max_samples))
+            start += max_samples
+        if chunks and end - chunks[-1][0] <= max_samples:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return chunks
+
+def speech_to_text(model, capture=None, timeout=None):
+    """Transcribe speech to text using Whisper model.
+
+    Audio is captured into a ring buffer and every stretch of speech is transcribed
+    as soon as the candidate pauses, so most of the answer is already text when
+    they stop talking. Pass an open mic_capture.MicrophoneCapture to reuse one
+    microphone stream across answers.
+    """
+    from mic_capture import MicrophoneCapture
+
+    owns_capture = capture is None
+    if owns_capture:
+        capture = MicrophoneCapture().open()
+    try:
+        print("Listening for your answer...")
+        parts = []
+        for segment in capture.segments(timeout=timeout):
+            # The segment is a 16 kHz float32 view into the ring buffer, Whisper reads it in place
+            parts.append(model.transcribe(segment, fp16=False)['text'].strip())
+    finally:
+        if owns_capture:
+            capture.close()
 
-    result = model.transcribe(resampled_audio)  # Transcribe using Whisper
-    text = result['text']
+    text = " ".join(part for part in parts if part)
     print(f"Recognized text: {text}")
-    return text
\ No newline at end of file
+    return text
@@ -1,6 +1,6 @@
 import speech_recognition as sr
 import numpy as np
-import torch
+from audio_conversion import resample_audio
 
 def audio_to_numpy(audio_data):
     """Convert AudioData to numpy array."""
@@ -9,12 +9,6 @@ def audio_to_numpy(audio_data):
     audio_np = audio_np.astype(np.float32) / 32768.0  # Normalize audio
     return audio_np
 
-def resample_audio(audio_np, original_rate=44100, target_rate=16000):
-    """Resample the audio numpy array to the target rate."""
-    audio_tensor = torch.from_numpy(audio_np).unsqueeze(0).unsqueeze(0)  # Shape (1, 1, length)
-    resampled_audio = torch.nn.functional.interpolate(audio_tensor, scale_factor=target_rate/original_rate, mode='linear', align_corners=False)
-    return resampled_audio.squeeze().numpy()
-
 def speech_to_text(model):
     """Transcribe speech to text using Whisper model."""
     recognizer = sr.Recognizer()
@@ -1,7 +1,10 @@
 import re
+from llm_stream import generate_text
+from tracing import tracer
 
-def generate_follow_up(question, answer, model):
-    """Generate follow-up question using the fine-tuned model"""
+@tracer.traced("followup_generation")
+def generate_follow_up(question, answer, model, on_delta=None, context=None):
+    """Generate follow-up question using the fine-tuned model, streaming text to on_delta if given"""
 
     prompt = f"""As a visa officer conducting an interview, I asked: "{question}"
 
@@ -12,7 +15,8 @@ Based on this response, generate ONE specific follow-up question that would help
 Follow-up question:"""
 
     try:
-        response = model.generate(prompt, max_tokens=200, temperature=0.7)
+        response = generate_text(model, prompt, max_tokens=200, temperature=0.7, on_delta=on_delta,
+                                 context=context)
 
         # Clean up the response
         follow_up = response.strip()
@@ -0,0 +1,118 @@
+"""
+followup_speculation.py
+
+Speculative follow-up generation. As soon as a usable transcript of an answer
+exists (the committed part of a live transcription, or the final answer) a
+follow-up is generated in the background. When the interview advances, the
+speculative result is reused if it was generated from the final answer or from a
+prefix covering most of it; otherwise it is cancelled and regenerated.
+"""
+import re
+import threading
+from concurrent.futures import CancelledError
+
+from follow_up_gen import generate_follow_up
+
+
+def _words(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+class _CancellableModel:
+    """Wraps a scheduler so the requests made through it can be cancelled"""
+
+    def __init__(self, model):
+        self.model = model
+        self.cancelled = False
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, **kwargs):
+        if not hasattr(self.model, "submit"):
+            return self.model.generate(prompt, **kwargs)
+        with self._lock:
+            if self.cancelled:
+                raise CancelledError()
+            future = self.model.submit(prompt, **kwargs)
+            self._futures.append(future)
+        return future.result()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            for future in self._futures:
+                future.cancel()
+
+
+class FollowUpSpeculator:
+    def __init__(self, llm, submit_blocking, context=None, min_words=12, regrow_ratio=1.5, reuse_ratio=0.8):
+        self.llm = llm
+        self.submit_blocking = submit_blocking
+        self.context = context
+        self.min_words = min_words
+        self.regrow_ratio = regrow_ratio
+        self.reuse_ratio = reuse_ratio
+        self._current = None
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "reused": 0, "cancelled": 0}
+
+    def _reusable(self, current, question_index, words):
+        """A speculation is reusable if it saw all of the answer or a long enough prefix of it"""
+        if current is None or current["question_index"] != question_index:
+            return False
+        seen = current["words"]
+        return seen == words or (len(seen) >= self.reuse_ratio * len(words) and words[:len(seen)] == seen)
+
+    def _cancel(self, current):
+        if current is not None:
+            current["model"].cancel()
+            current["future"].cancel()
+            self.stats["cancelled"] += 1
+
+    def speculate(self, question_index, question, answer, final=False):
+        """Start generating a follow-up from an answer transcript, partial unless final"""
+        words = _words(answer)
+        if len(words) < self.min_words and not final:
+            return
+
+        with self._lock:
+            current = self._current
+            if current is not None and current["question_index"] == question_index:
+                if final and self._reusable(current, question_index, words):
+                    return
+                # Partial transcripts restart the speculation only once they grew substantially
+                if not final and len(words) < len(current["words"]) * self.regrow_ratio:
+                    return
+            self._cancel(current)
+
+            model = _CancellableModel(self.llm)
+            future = self.submit_blocking(
+                generate_follow_up,
+                question=question,
+                answer=answer,
+                model=model,
+                context=self.context
+            )
+            self._current = {
+                "question_index": question_index,
+                "words": words,
+                "model": model,
+                "future": future
+            }
+            self.stats["started"] += 1
+
+    def take(self, question_index, answer):
+        """Return the Future of a reusable speculative follow-up, or None after cancelling it"""
+        with self._lock:
+            current, self._current = self._current, None
+            if self._reusable(current, question_index, _words(answer)):
+                self.stats["reused"] += 1
+                return current["future"]
+            self._cancel(current)
+            return None
+
+    def cancel(self):
+        """Drop any running speculation, e.g. when follow-ups are disabled or the session ends"""
+        with self._lock:
+            current, self._current = self._current, None
+            self._cancel(current)
@@ -0,0 +1,86 @@
+"""
+incremental_analysis.py
+
+Per-session analyzer that scores each answer in the background as soon as it is
+submitted, keeping running per-section results. At the end of the interview only
+answers that are still missing are analyzed, followed by a short merge step, so the
+report is ready shortly after the final answer instead of after one long generation.
+"""
+import threading
+from concurrent.futures import wait
+
+from analyzeSW import analyze_answer, merge_analyses
+
+
+class IncrementalAnalyzer:
+    def __init__(self, llm, submit_blocking, context=None):
+        self.llm = llm
+        self.submit_blocking = submit_blocking
+        self.context = context
+        self._futures = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def add(self, question, answer):
+        """Start analyzing an answer in the background"""
+        future = self.submit_blocking(analyze_answer, question, answer, self.llm, context=self.context)
+        with self._lock:
+            previous = self._futures.get(question)
+            if previous is not None:
+                previous.cancel()
+            self._futures[question] = (answer, future)
+        future.add_done_callback(lambda done, q=question, a=answer: self._record(q, a, done))
+
+    def _record(self, question, answer, future):
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error analyzing answer: {e}")
+            return
+        with self._lock:
+            # Ignore results for an answer that was replaced since
+            if self._futures.get(question, (None,))[0] == answer:
+                self._results[question] = result
+
+    def partial(self):
+        """Running per-section results of the answers analyzed so far"""
+        with self._lock:
+            results = list(self._results.values())
+        return {
+            section: [item for result in results for item in result[section]]
+            for section in ("strengths", "weaknesses", "recommendations")
+        }
+
+    def _run_inline(self, question, answer):
+        with self._lock:
+            self._futures[question] = (answer, None)
+        try:
+            result = analyze_answer(question, answer, self.llm, context=self.context)
+        except Exception as e:
+            print(f"Error analyzing answer: {e}")
+            return
+        with self._lock:
+            self._results[question] = result
+
+    def finish(self, interview_data, on_delta=None):
+        """Wait for answers being analyzed, analyze the rest inline, and merge"""
+        running = []
+        for question, answer in interview_data.items():
+            with self._lock:
+                tracked = self._futures.get(question)
+            # Analyses still queued are run here rather than waiting for a free worker,
+            # which could deadlock when every worker is itself finishing an interview
+            if tracked is None or tracked[0] != answer or (tracked[1] is not None and tracked[1].cancel()):
+                self._run_inline(question, answer)
+            elif tracked[1] is not None:
+                running.append((question, answer, tracked[1]))
+        wait([future for _, _, future in running])
+        # Done callbacks may still be pending when wait returns, record directly
+        for question, answer, future in running:
+            self._record(question, answer, future)
+
+        with self._lock:
+            partial_analyses = [self._results[question] for question in interview_data if question in self._results]
+        return merge_analyses(partial_analyses, self.llm, on_delta=on_delta, context=self.context)
@@ -0,0 +1,439 @@
+"""
+inference_scheduler.py
+
+Continuous-batching scheduler in front of VisaOfficerLLM. Question, follow-up and
+analysis requests from every interview session are queued here and decoded together:
+new requests are prefilled with left padding and merged into the running batch
+between decode steps, and each caller gets its result as soon as its own sequence
+finishes instead of waiting for the whole batch. Callers can also stream a request
+to receive text deltas as tokens are sampled.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError
+
+import torch
+import torch.nn.functional as F
+
+try:
+    from transformers import DynamicCache
+except ImportError:
+    DynamicCache = None
+
+from prefix_cache import PrefixCache
+
+# Stand-in user message used to find where the shared chat prefix ends
+PREFIX_SENTINEL = "\u0000PREFIX_END\u0000"
+
+
+def _to_legacy(past):
+    """Return past key values as a tuple of (key, value) tensors per layer"""
+    if hasattr(past, "to_legacy_cache"):
+        return past.to_legacy_cache()
+    return past
+
+
+def _from_legacy(past):
+    """Wrap legacy past key values in the cache class the model expects"""
+    if DynamicCache is not None:
+        return DynamicCache.from_legacy_cache(past)
+    return past
+
+
+def _pad_past_left(past, pad):
+    """Left pad every key/value tensor of shape (batch, heads, seq, dim) along seq"""
+    if pad == 0:
+        return past
+    return tuple(tuple(F.pad(t, (0, 0, pad, 0)) for t in layer) for layer in past)
+
+
+def _select_past(past, index):
+    """Keep only the batch rows given by index"""
+    return tuple(tuple(t.index_select(0, index) for t in layer) for layer in past)
+
+
+def _filter_top_k_top_p(logits, top_k, top_p):
+    """Mask the logits of each row outside its top_k tokens and its top_p nucleus"""
+    if 0 < top_k < logits.size(-1):
+        kth = torch.topk(logits, top_k, dim=-1).values[..., -1:]
+        logits = logits.masked_fill(logits < kth, float("-inf"))
+    if top_p < 1.0:
+        sorted_logits, sorted_index = torch.sort(logits, descending=True, dim=-1)
+        sorted_probs = torch.softmax(sorted_logits, dim=-1)
+        # Drop a token once the tokens ranked above it already hold top_p, the first always stays
+        remove = sorted_probs.cumsum(dim=-1) - sorted_probs >= top_p
+        logits = logits.masked_fill(remove.scatter(-1, sorted_index, remove), float("-inf"))
+    return logits
+
+
+class InferenceScheduler:
+    def __init__(self, llm, max_batch_size=8, batch_wait=0.01, prefix_cache=None, min_prefix_tokens=16):
+        self.llm = llm
+        self.tokenizer = llm.tokenizer
+        self.model = llm.model
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait
+        self.prefix_cache = prefix_cache
+        self.min_prefix_tokens = min_prefix_tokens
+
+        # Sample the way model.generate() would, with the model's own top-k/top-p settings
+        generation_config = getattr(self.model, "generation_config", None)
+        self.top_k = getattr(generation_config, "top_k", None) or 0
+        self.top_p = getattr(generation_config, "top_p", None) or 1.0
+
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.eos_token_id = self.tokenizer.eos_token_id
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._running = False
+
+        # Running batch state, only touched by the scheduler thread
+        self._active = []
+        self._past = None
+        self._attention_mask = None
+        self._next_tokens = None
+
+        self.stats = {
+            "requests": 0,
+            "completed": 0,
+            "decode_steps": 0,
+            "prefill_batches": 0,
+            "max_batch_seen": 0,
+            "cancelled": 0
+        }
+
+    def start(self):
+        with self._start_lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._loop, name="inference-scheduler")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._queue.put(None)
+
+    def submit(self, prompt, max_tokens=512, temperature=0.7, deltas=None, context=None):
+        """Queue a prompt and return a Future resolving to the generated text.
+
+        Cancelling the Future drops the request from the batch at the next step.
+
+        context is session level text added to the system turn, which makes it part
+        of the cached prefix. If deltas is a queue, new text is put on it as tokens
+        are sampled and a final None marks the end of the stream.
+        """
+        self.start()
+        future = Future()
+        self._queue.put({
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "future": future,
+            "deltas": deltas,
+            "context": context,
+            "submitted_at": time.time()
+        })
+        self.stats["requests"] += 1
+        return future
+
+    def stream(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        """Yield text deltas for a prompt as the batch decodes it"""
+        deltas = queue.Queue()
+        future = self.submit(prompt, max_tokens=max_tokens, temperature=temperature, deltas=deltas, context=context)
+        while True:
+            delta = deltas.get()
+            if delta is None:
+                break
+            yield delta
+        # Surface generation errors to the consumer
+        future.result()
+
+    def generate(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        """Blocking drop-in replacement for VisaOfficerLLM.generate"""
+        return self.submit(prompt, max_tokens=max_tokens, temperature=temperature, context=context).result()
+
+    def count_tokens(self, text):
+        return self.llm.count_tokens(text)
+
+    def _take_pending(self, block):
+        """Pull as many queued requests as there are free batch slots"""
+        pending = []
+        free_slots = self.max_batch_size - len(self._active)
+        if free_slots <= 0:
+            return pending
+
+        if block:
+            item = self._queue.get()
+            if item is None:
+                return pending
+            pending.append(item)
+            # Give concurrent callers a moment to join the same prefill
+            time.sleep(self.batch_wait)
+
+        while len(pending) < free_slots:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                continue
+            pending.append(item)
+        # Callers may have cancelled while their request was queued
+        return [item for item in pending if not self._drop_if_cancelled(item)]
+
+    def _drop_if_cancelled(self, item):
+        """Close the stream of a cancelled request, return True if it was cancelled"""
+        if not item["future"].cancelled():
+            return False
+        if item["deltas"] is not None:
+            item["deltas"].put(None)
+        self.stats["cancelled"] += 1
+        return True
+
+    def _sample(self, logits, temperatures):
+        """Sample one token per row, greedy where temperature is zero"""
+        greedy = logits.argmax(dim=-1)
+        safe_temps = temperatures.clamp(min=1e-5).unsqueeze(-1)
+        scaled = _filter_top_k_top_p(logits.float() / safe_temps, self.top_k, self.top_p)
+        probs = torch.softmax(scaled, dim=-1)
+        sampled = torch.multinomial(probs, num_samples=1).squeeze(-1)
+        return torch.where(temperatures > 0, sampled, greedy)
+
+    def _split_prompt(self, item):
+        """Tokenize a request and split off the shared chat prefix when one applies"""
+        context = item["context"]
+        full_ids = self.tokenizer(self.llm.format_prompt(item["prompt"], context=context))["input_ids"]
+        if self.prefix_cache is None:
+            return None, full_ids
+
+        # Everything before the user message is shared by all prompts with this context
+        formatted = self.llm.format_prompt(PREFIX_SENTINEL, context=context)
+        prefix_ids = self.tokenizer(formatted.split(PREFIX_SENTINEL)[0])["input_ids"]
+        if (len(prefix_ids) < self.min_prefix_tokens or len(prefix_ids) >= len(full_ids)
+                or full_ids[:len(prefix_ids)] != prefix_ids):
+            return None, full_ids
+        return prefix_ids, full_ids[len(prefix_ids):]
+
+    def _prefix_past(self, key, prefix_ids):
+        """Return past key values for a prefix, encoding and caching it on a miss"""
+        past = self.prefix_cache.get(key)
+        if past is not None:
+            return past
+
+        input_ids = torch.tensor([prefix_ids], device=self.model.device)
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids, use_cache=True)
+        past = _to_legacy(outputs.past_key_values)
+        self.prefix_cache.put(key, past, len(prefix_ids))
+        return past
+
+    def _prefill_group(self, items, prefix_ids, prefix_past):
+        """Left pad the suffixes of requests sharing a prefix and sample their first token"""
+        device = self.model.device
+        batch = len(items)
+        suffixes = [item["suffix_ids"] for item in items]
+        length = max(len(suffix) for suffix in suffixes)
+        pad_id = self.tokenizer.pad_token_id
+
+        input_ids = torch.tensor([[pad_id] * (length - len(suffix)) + suffix for suffix in suffixes], device=device)
+        attention_mask = torch.tensor([[0] * (length - len(suffix)) + [1] * len(suffix) for suffix in suffixes],
+                                      device=device)
+
+        past = None
+        prefix_len = 0
+        if prefix_past is not None:
+            prefix_len = len(prefix_ids)
+            past = _from_legacy(tuple(tuple(t.expand(batch, -1, -1, -1) for t in layer) for layer in prefix_past))
+            attention_mask = torch.cat([
+                torch.ones(batch, prefix_len, dtype=attention_mask.dtype, device=device),
+                attention_mask
+            ], dim=1)
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, prefix_len:]
+
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=past,
+                use_cache=True
+            )
+
+        temperatures = torch.tensor([item["temperature"] for item in items], device=device)
+        next_tokens = self._sample(outputs.logits[:, -1, :], temperatures)
+        return _to_legacy(outputs.past_key_values), attention_mask, next_tokens
+
+    def _prefill(self, pending):
+        """Prefill new requests, batching together those that share a cached prefix"""
+        groups = OrderedDict()
+        for item in pending:
+            prefix_ids, suffix_ids = self._split_prompt(item)
+            item["suffix_ids"] = suffix_ids
+            item["generated"] = []
+            item["text"] = ""
+            key = PrefixCache.key(prefix_ids) if prefix_ids else None
+            groups.setdefault(key, (prefix_ids, []))[1].append(item)
+
+        prefilled = []
+        for key, (prefix_ids, items) in groups.items():
+            prefix_past = self._prefix_past(key, prefix_ids) if key else None
+            prefilled.append((items,) + self._prefill_group(items, prefix_ids, prefix_past))
+            self.stats["prefill_batches"] += 1
+        return prefilled
+
+    def _admit(self, pending):
+        """Merge freshly prefilled requests into the running batch"""
+        for items, past, attention_mask, next_tokens in self._prefill(pending):
+            # Only the new rows have an unconsumed token, running rows took theirs after the last step
+            keep = self._advance(items, next_tokens)
+            if not keep:
+                continue
+            if len(keep) < len(items):
+                index = torch.tensor(keep, device=attention_mask.device)
+                items = [items[row] for row in keep]
+                past = _select_past(past, index)
+                attention_mask = attention_mask.index_select(0, index)
+                next_tokens = next_tokens.index_select(0, index)
+            self._merge(items, past, attention_mask, next_tokens)
+
+    def _merge(self, items, past, attention_mask, next_tokens):
+        if not self._active:
+            self._past, self._attention_mask, self._next_tokens = past, attention_mask, next_tokens
+            self._active = list(items)
+            return
+
+        running_len = self._attention_mask.shape[1]
+        new_len = attention_mask.shape[1]
+        length = max(running_len, new_len)
+
+        running_past = _pad_past_left(self._past, length - running_len)
+        new_past = _pad_past_left(past, length - new_len)
+        self._past = tuple(
+            tuple(torch.cat([a, b], dim=0) for a, b in zip(running_layer, new_layer))
+            for running_layer, new_layer in zip(running_past, new_past)
+        )
+        self._attention_mask = torch.cat([
+            F.pad(self._attention_mask, (length - running_len, 0)),
+            F.pad(attention_mask, (length - new_len, 0))
+        ], dim=0)
+        self._next_tokens = torch.cat([self._next_tokens, next_tokens], dim=0)
+        self._active.extend(items)
+
+    def _push_delta(self, item, final=False):
+        """Send the text produced since the last delta to a streaming caller"""
+        text = self.tokenizer.decode(item["generated"], skip_special_tokens=True)
+        # Hold back incomplete multi-byte characters until the next token completes them
+        if not final and text.endswith("\ufffd"):
+            return text
+        if item["deltas"] is not None and len(text) > len(item["text"]):
+            item["deltas"].put(text[len(item["text"]):])
+        item["text"] = text
+        return text
+
+    def _advance(self, items, next_tokens):
+        """Append each row's sampled token, resolve finished sequences and return the rows still running"""
+        keep = []
+        for row, item in enumerate(items):
+            if self._drop_if_cancelled(item):
+                continue
+            token = int(next_tokens[row])
+            finished = token == self.eos_token_id
+            if not finished:
+                item["generated"].append(token)
+                finished = len(item["generated"]) >= item["max_tokens"]
+                if not finished and item["deltas"] is not None:
+                    self._push_delta(item)
+
+            if finished:
+                text = self._push_delta(item, final=True)
+                if item["deltas"] is not None:
+                    item["deltas"].put(None)
+                try:
+                    item["future"].set_result(text.strip())
+                except InvalidStateError:
+                    pass  # Cancelled by the caller while the last token was sampled
+                self.stats["completed"] += 1
+            else:
+                keep.append(row)
+        return keep
+
+    def _collect_finished(self):
+        """Consume the tokens sampled by the last decode step and drop finished sequences"""
+        keep = self._advance(self._active, self._next_tokens)
+        if len(keep) == len(self._active):
+            return
+        if not keep:
+            self._reset()
+            return
+
+        index = torch.tensor(keep, device=self._attention_mask.device)
+        self._active = [self._active[row] for row in keep]
+        self._past = _select_past(self._past, index)
+        self._attention_mask = self._attention_mask.index_select(0, index)
+        self._next_tokens = self._next_tokens.index_select(0, index)
+
+        # Drop leading columns that are padding for every remaining row
+        leading = int((self._attention_mask.sum(dim=0) == 0).long().cumprod(dim=0).sum())
+        if leading:
+            self._attention_mask = self._attention_mask[:, leading:]
+            self._past = tuple(tuple(t[:, :, leading:, :] for t in layer) for layer in self._past)
+
+    def _decode_step(self):
+        """Feed the last sampled token of every active sequence through the model"""
+        attention_mask = F.pad(self._attention_mask, (0, 1), value=1)
+        position_ids = attention_mask.sum(dim=-1, keepdim=True) - 1
+        temperatures = torch.tensor([item["temperature"] for item in self._active], device=self.model.device)
+
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=self._next_tokens.unsqueeze(-1),
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=_from_legacy(self._past),
+                use_cache=True
+            )
+
+        self._past = _to_legacy(outputs.past_key_values)
+        self._attention_mask = attention_mask
+        self._next_tokens = self._sample(outputs.logits[:, -1, :], temperatures)
+        self.stats["decode_steps"] += 1
+
+    def _reset(self):
+        self._active = []
+        self._past = None
+        self._attention_mask = None
+        self._next_tokens = None
+
+    def _fail_all(self, err, pending=()):
+        for item in list(self._active) + list(pending):
+            if not item["future"].done():
+                item["future"].set_exception(err)
+            if item["deltas"] is not None:
+                item["deltas"].put(None)
+        self._reset()
+
+    def _loop(self):
+        while self._running:
+            pending = []
+            try:
+                pending = self._take_pending(block=not self._active)
+                if pending:
+                    self._admit(pending)
+                    pending = []
+                    self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(self._active))
+
+                if self._active:
+                    self._decode_step()
+                    self._collect_finished()
+            except Exception as e:
+                print(f"Error in inference scheduler: {e}")
+                import traceback
+                traceback.print_exc()
+                self._fail_all(e, pending)
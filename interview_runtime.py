@@ -0,0 +1,91 @@
+"""
+interview_runtime.py
+
+Shared asyncio runtime that drives every interview session. One background thread
+runs the event loop; blocking work (LLM calls, TTS) is handed to a bounded worker
+pool. Sessions advance through coroutines triggered by Socket.IO events, so a
+session that is waiting for the candidate holds no thread at all, just its state
+and a timeout handle on the loop.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InterviewRuntime:
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="interview-worker")
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        self.stats = {
+            "tasks_submitted": 0,
+            "tasks_failed": 0,
+            "blocking_calls": 0
+        }
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="interview-runtime")
+            self._thread.daemon = True
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+        self._loop.run_forever()
+
+    def _report_failure(self, future):
+        if future.cancelled():
+            return
+        err = future.exception()
+        if err is not None:
+            self.stats["tasks_failed"] += 1
+            print(f"Error in interview task: {err}")
+
+    def submit(self, coro):
+        """Schedule a coroutine on the runtime loop from any thread"""
+        self.start()
+        self.stats["tasks_submitted"] += 1
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future.add_done_callback(self._report_failure)
+        return future
+
+    def call_soon(self, callback, *args):
+        """Run a plain callback on the runtime loop from any thread"""
+        self.start()
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def call_later(self, delay, callback, *args):
+        """Arm a timer; must be called from the runtime loop"""
+        return self._loop.call_later(delay, callback, *args)
+
+    def cancel(self, handle):
+        """Cancel a timer handle from any thread"""
+        if handle is not None:
+            self._loop.call_soon_threadsafe(handle.cancel)
+
+    def run_blocking(self, fn, *args, **kwargs):
+        """Run a blocking call on the worker pool, awaitable from the runtime loop"""
+        self.stats["blocking_calls"] += 1
+        # Carry context variables (trace tags) into the worker, like asyncio.to_thread
+        context = contextvars.copy_context()
+        return self._loop.run_in_executor(self._executor, functools.partial(context.run, fn, *args, **kwargs))
+
+    def submit_blocking(self, fn, *args, **kwargs):
+        """Run a blocking call on the worker pool from any thread, returns a Future"""
+        self.stats["blocking_calls"] += 1
+        return self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def active_tasks(self):
+        if self._loop is None:
+            return 0
+        return len(asyncio.all_tasks(self._loop))
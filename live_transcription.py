@@ -0,0 +1,140 @@
+"""
+live_transcription.py
+
+Incremental transcription of an answer while the candidate is still speaking.
+The client streams MediaRecorder chunks, which are fed to one ffmpeg process as they
+arrive so each chunk is decoded once; only the audio after the last committed
+segment is transcribed. Whisper segments
+that are followed by at least one more segment are committed, the trailing one
+stays tentative because it may be cut mid-word. The submission only marks the end of
+the stream, so only the tail after the committed audio needs transcribing.
+"""
+import threading
+import time
+
+from audio_conversion import decode_audio_bytes, StreamingAudioDecoder, WHISPER_SAMPLE_RATE
+
+
+class LiveTranscriber:
+    def __init__(self, transcribe_fn, question_index, update_interval=2.0, min_window_seconds=1.0,
+                 keep_tail_segments=1, prompt_chars=200):
+        self.transcribe_fn = transcribe_fn
+        self.question_index = question_index
+        self.update_interval = update_interval
+        self.min_window_samples = int(min_window_seconds * WHISPER_SAMPLE_RATE)
+        self.keep_tail_segments = keep_tail_segments
+        self.prompt_chars = prompt_chars
+
+        self._chunks = []
+        self._decoder = None
+        self._decode_failed = False
+        self._closed = False
+        self._chunks_lock = threading.Lock()
+        self._transcribe_lock = threading.Lock()
+        self._last_update = 0.0
+
+        self.committed_text = ""
+        self.committed_samples = 0
+        self.tentative_text = ""
+        self.updates = 0
+
+    def add_chunk(self, chunk):
+        """Append a recorded chunk, return True when a partial update is due"""
+        with self._chunks_lock:
+            if self._closed:
+                # Late chunk of a finished or discarded answer, it must not start a new decoder
+                return False
+            self._chunks.append(bytes(chunk))
+            if not self._decode_failed:
+                try:
+                    if self._decoder is None:
+                        self._decoder = StreamingAudioDecoder()
+                    self._decoder.feed(self._chunks[-1])
+                except (OSError, RuntimeError) as e:
+                    # No partial updates then, finish() decodes the whole recording
+                    print(f"Error streaming answer audio to ffmpeg: {e}")
+                    self._decode_failed = True
+                    if self._decoder is not None:
+                        self._decoder.abort()
+                        self._decoder = None
+        return time.time() - self._last_update >= self.update_interval
+
+    @property
+    def chunk_count(self):
+        with self._chunks_lock:
+            return len(self._chunks)
+
+    def __sizeof__(self):
+        # Counted against the session store's memory cap: recorded chunks and decoded PCM
+        with self._chunks_lock:
+            buffered = sum(len(chunk) for chunk in self._chunks)
+            if self._decoder is not None:
+                buffered += self._decoder.buffered_bytes()
+        return object.__sizeof__(self) + buffered
+
+    def text(self):
+        return " ".join(part for part in (self.committed_text, self.tentative_text) if part).strip()
+
+    def _decoded(self):
+        with self._chunks_lock:
+            decoder = self._decoder
+        return decoder.audio() if decoder is not None else None
+
+    def _finish_decoding(self):
+        """Whole answer audio, from the stream unless streaming to ffmpeg failed"""
+        with self._chunks_lock:
+            self._closed = True
+            decoder, self._decoder = self._decoder, None
+            if decoder is None:
+                recorded = b"".join(self._chunks)
+        if decoder is not None:
+            return decoder.close()
+        return decode_audio_bytes(recorded)
+
+    def close(self):
+        """Stop the decoder of an answer that will not be finished"""
+        with self._chunks_lock:
+            self._closed = True
+            decoder, self._decoder = self._decoder, None
+        if decoder is not None:
+            decoder.abort()
+
+    def _transcribe(self, audio, prompted=True):
+        prompt = self.committed_text[-self.prompt_chars:] if prompted else ""
+        return self.transcribe_fn(audio, initial_prompt=prompt or None)
+
+    def update(self):
+        """Transcribe the uncommitted window; returns the partial text, or None if busy or finished"""
+        if not self._transcribe_lock.acquire(blocking=False):
+            return None
+        try:
+            self._last_update = time.time()
+            audio = self._decoded()
+            if audio is None:
+                return None
+            window = audio[self.committed_samples:]
+            if window.size < self.min_window_samples:
+                return self.text()
+
+            segments = self._transcribe(window).get("segments", [])
+            stable_count = max(len(segments) - self.keep_tail_segments, 0)
+            for segment in segments[:stable_count]:
+                self.committed_text = f"{self.committed_text} {segment['text'].strip()}".strip()
+            if stable_count:
+                self.committed_samples += int(segments[stable_count - 1]["end"] * WHISPER_SAMPLE_RATE)
+            self.tentative_text = " ".join(segment["text"].strip() for segment in segments[stable_count:])
+            self.updates += 1
+            return self.text()
+        finally:
+            self._transcribe_lock.release()
+
+    def finish(self):
+        """Transcribe only the tail after the committed audio and return the full answer"""
+        with self._transcribe_lock:
+            audio = self._finish_decoding()
+            tail = audio[self.committed_samples:]
+            self.tentative_text = ""
+            if tail.size >= WHISPER_SAMPLE_RATE // 10:
+                # Unprompted, so the tails of answers submitted together share one Whisper batch
+                self.tentative_text = self._transcribe(tail, prompted=False)["text"].strip()
+            return self.text()
@@ -0,0 +1,519 @@
+"""
+llm_backends.py
+
+Inference backends for the visa officer model. Every backend exposes the same
+interface (generate, stream, batch, tokenize, count_tokens) and formats prompts
+with the same system prompt, so the rest of the app does not care whether tokens
+come from transformers, a quantized GGUF model running on llama.cpp, or a local
+HTTP server (Ollama, llama.cpp server, vLLM) speaking the OpenAI API.
+
+The backend is picked by name with create_backend:
+    transformers  the merged fine-tuned model in visa_officer_merged (float16 on GPU; bfloat16 or
+                  float32 on CPU, dynamic int8 on request, checked against float32 at startup)
+    gguf          the GGUF export from the training notebook, int4 (q4_k_m) or int8 (q8_0), on CPU
+    http          any OpenAI compatible /v1/chat/completions endpoint
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from llm_stream import approximate_token_count
+
+# torch, transformers and llama_cpp are imported where they are needed, so importing
+# this module (and app.py) stays cheap and the gguf and http backends never load torch
+
+SYSTEM_PROMPT = """You are an experienced Visa Officer conducting a visa interview. You are professional, thorough, and fair. You ask relevant questions
+                   to assess the applicant's eligibility and intentions. Be direct but courteous."""
+
+# GGUF quantization presets exported by the notebook
+GGUF_QUANTIZATIONS = {
+    "int4": "q4_k_m",
+    "int8": "q8_0"
+}
+
+
+# Fixed prompts the int8 model is checked against at startup
+SELF_CHECK_PROMPTS = [
+    "Why do you want to study in the United States?",
+    "Why did you choose this university over the others that admitted you?",
+    "Who is sponsoring your education and what do they do for a living?",
+    "What are your plans after you finish your degree?",
+    "Ask the applicant one follow-up question about their answer: I have an admit for MS Computer Science at Arizona State University."
+]
+SELF_CHECK_MIN_AGREEMENT = 0.9
+PRECISIONS = ("auto", "float16", "bfloat16", "int8", "float32")
+
+
+def cpu_supports_bf16():
+    import torch
+
+    try:
+        return torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def resolve_precision(precision="auto"):
+    """float16 on GPU; on CPU, auto means bfloat16 when the CPU has native support, otherwise float32.
+
+    int8 changes the model's outputs, so it is only used when asked for explicitly.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision} (expected one of {', '.join(PRECISIONS)})")
+    if precision != "auto":
+        return precision
+    import torch
+
+    if torch.cuda.is_available():
+        return "float16"
+    return "bfloat16" if cpu_supports_bf16() else "float32"
+
+
+def mmap_safetensors(model_path):
+    """State dict whose tensors are views of the model's safetensors files mapped copy-on-write.
+
+    Nothing is read until a page is touched, and untouched pages stay shared through
+    the page cache by every process (forked workers included) that maps the same file.
+    Returns the state dict and the mmaps backing it.
+    """
+    import torch
+
+    dtypes = {
+        "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+        "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+        "U8": torch.uint8, "BOOL": torch.bool
+    }
+    files = sorted(glob.glob(os.path.join(model_path, "*.safetensors")))
+    if not files:
+        raise FileNotFoundError(f"No safetensors weights in {model_path}")
+
+    state, maps = {}, []
+    for path in files:
+        with open(path, "rb") as weights_file:
+            mapped = mmap.mmap(weights_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        maps.append(mapped)
+        # Layout: u64 header length, JSON header, then the raw tensor data
+        header_length = struct.unpack("<Q", mapped[:8])[0]
+        header = json.loads(mapped[8:8 + header_length])
+        data_start = 8 + header_length
+        for name, meta in header.items():
+            if name == "__metadata__":
+                continue
+            dtype = dtypes[meta["dtype"]]
+            start, end = meta["data_offsets"]
+            count = (end - start) // dtype.itemsize
+            if count:
+                tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + start)
+            else:
+                tensor = torch.empty(0, dtype=dtype)
+            state[name] = tensor.reshape(meta["shape"])
+    return state, maps
+
+
+class LLMBackend:
+    """Common interface; subclasses implement generate, stream and tokenize"""
+    name = "base"
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    def __init__(self, batch_workers=4, progress=None):
+        self.batch_workers = batch_workers
+        # Optional report(fraction) callback for load progress
+        self.progress = progress
+
+    def messages(self, prompt, context=None):
+        system_prompt = self.SYSTEM_PROMPT
+        if context:
+            # Session context lives in the system turn so it is part of the shared prefix
+            system_prompt = f"{system_prompt}\n\n{context.strip()}"
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    def format_prompt(self, prompt, context=None):
+        """Wrap a user prompt with the visa officer system prompt in Llama 3 chat format"""
+        system_prompt, user_prompt = (message["content"] for message in self.messages(prompt, context))
+        return f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n{system_prompt}<|eot_id|><|start_header_id|>user<|end_header_id|>\n{user_prompt}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n"
+
+    def tokenize(self, text):
+        raise NotImplementedError
+
+    def count_tokens(self, text):
+        """Number of tokens text encodes to, without special tokens"""
+        return len(self.tokenize(text))
+
+    def generate(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        raise NotImplementedError
+
+    def stream(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        raise NotImplementedError
+
+    def batch(self, prompts, max_tokens=512, temperature=0.7, context=None):
+        """Generate a response for each prompt; backends without native batching run them concurrently"""
+        with ThreadPoolExecutor(max_workers=max(1, min(self.batch_workers, len(prompts)))) as executor:
+            return list(executor.map(
+                lambda prompt: self.generate(prompt, max_tokens=max_tokens, temperature=temperature, context=context),
+                prompts
+            ))
+
+    def info(self):
+        return {"backend": self.name}
+
+
+class VisaOfficerLLM(LLMBackend):
+    """Transformers backend for the merged fine-tuned model"""
+    name = "transformers"
+
+    def __init__(self, model_path="visa_officer_merged", precision="auto", self_check=True,
+                 min_agreement=SELF_CHECK_MIN_AGREEMENT, mmap_weights=True, **kwargs):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        super().__init__(**kwargs)
+        print(f"Loading Custom Fine Tuned Model from {model_path}...")
+        self.model_path = model_path
+        self.precision = resolve_precision(precision)
+        self.self_check_result = None
+        self.mmapped = False
+        self._weight_maps = []
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+        if self.precision == "float16":
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                torch_dtype=torch.float16,
+                device_map="auto",
+                low_cpu_mem_usage=True
+            )
+        else:
+            # CPU paths: float16 matmuls are slow and lossy on CPU, int8 is quantized from float32,
+            # so its load briefly peaks at the full float32 model before quantization frees the weights
+            dtype = torch.bfloat16 if self.precision == "bfloat16" else torch.float32
+            # int8 replaces the weights anyway, mapping them only pays off when they are served as stored
+            self.model = self._load_mmapped(dtype) if mmap_weights and self.precision != "int8" else None
+            if self.model is None:
+                self.model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=dtype, low_cpu_mem_usage=True)
+            self.model.eval()
+
+        if self.precision == "int8":
+            reference = self._reference_logits() if self_check else None
+            # Weights of the nn.Linear layers become int8, activations are quantized per batch at runtime.
+            # The output head stays float32: its logits are what sampling sees and it suffers most from int8
+            head = self.model.get_output_embeddings()
+            qconfig_spec = {
+                name: torch.ao.quantization.default_dynamic_qconfig
+                for name, module in self.model.named_modules()
+                if isinstance(module, torch.nn.Linear) and module is not head
+            }
+            torch.ao.quantization.quantize_dynamic(self.model, qconfig_spec, dtype=torch.qint8, inplace=True)
+            if reference is not None:
+                self.self_check_result = self._self_check(reference, min_agreement)
+
+        self.conversion_history = []
+        print(f"Fine-tuned model loaded successfully! ({self.precision}{', mmapped' if self.mmapped else ''})")
+
+    def _load_mmapped(self, dtype):
+        """Build the model around memory-mapped weights, or None when they can't be used as stored"""
+        from transformers import AutoConfig, AutoModelForCausalLM
+        from transformers.modeling_utils import no_init_weights
+
+        try:
+            state, maps = mmap_safetensors(self.model_path)
+        except FileNotFoundError:
+            return None
+        if any(tensor.is_floating_point() and tensor.dtype != dtype for tensor in state.values()):
+            # Casting would copy every weight, let from_pretrained do it
+            return None
+        if self.progress:
+            self.progress(0.3)
+
+        # Parameters are allocated but never initialized or touched, then swapped for the mapped tensors
+        with no_init_weights():
+            model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(self.model_path), torch_dtype=dtype)
+        missing, _ = model.load_state_dict(state, strict=False, assign=True)
+        model.tie_weights()
+        if any(key != "lm_head.weight" or not model.config.tie_word_embeddings for key in missing):
+            print(f"Memory-mapped load missing {len(missing)} weights, falling back to from_pretrained")
+            return None
+        if self.progress:
+            self.progress(0.8)
+
+        self._weight_maps = maps
+        self.mmapped = True
+        return model
+
+    def _prompt_ids(self, prompt):
+        return self.tokenizer.encode(self.format_prompt(prompt), return_tensors="pt", add_special_tokens=False)
+
+    def _reference_logits(self):
+        """Logits of the unquantized model over the self-check prompts, with the time they took"""
+        import torch
+
+        started = time.time()
+        with torch.no_grad():
+            logits = [self.model(self._prompt_ids(prompt)).logits[0].float() for prompt in SELF_CHECK_PROMPTS]
+        return logits, time.time() - started
+
+    def _self_check(self, reference, min_agreement):
+        """Compare the quantized model against the reference: next-token agreement and mean KL"""
+        import torch
+
+        reference_logits, reference_seconds = reference
+        started = time.time()
+        agree = total = 0
+        kl_total = 0.0
+        with torch.no_grad():
+            for prompt, expected in zip(SELF_CHECK_PROMPTS, reference_logits):
+                logits = self.model(self._prompt_ids(prompt)).logits[0].float()
+                agree += (logits.argmax(-1) == expected.argmax(-1)).sum().item()
+                total += logits.shape[0]
+                kl_total += torch.nn.functional.kl_div(
+                    torch.log_softmax(logits, -1), torch.log_softmax(expected, -1),
+                    log_target=True, reduction="sum"
+                ).item()
+        seconds = time.time() - started
+
+        result = {
+            "agreement": agree / max(total, 1),
+            "mean_kl": kl_total / max(total, 1),
+            "positions": total,
+            "speedup": reference_seconds / seconds if seconds else None,
+            "passed": agree / max(total, 1) >= min_agreement
+        }
+        print(f"int8 self-check: {result['agreement']:.1%} next-token agreement, mean KL {result['mean_kl']:.4f}, "
+              f"{result['speedup'] or 0:.2f}x faster than float32")
+        if not result["passed"]:
+            print(f"Warning: int8 model agrees with float32 on only {result['agreement']:.1%} of positions "
+                  f"(expected at least {min_agreement:.0%}), consider LLM_PRECISION=bfloat16")
+        return result
+
+    def tokenize(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def format_prompt(self, prompt, context=None):
+        try:
+            return self.tokenizer.apply_chat_template(
+                self.messages(prompt, context),
+                tokenize=False,
+                add_generation_prompt=True
+            )
+        except:
+            # Fallback Formatting if the above template doesn't work
+            return super().format_prompt(prompt, context=context)
+
+    def _generate_kwargs(self, max_tokens, temperature):
+        return {
+            "max_new_tokens": max_tokens,
+            "temperature": temperature,
+            "do_sample": True,
+            "pad_token_id": self.tokenizer.eos_token_id,
+            "eos_token_id": self.tokenizer.eos_token_id
+        }
+
+    # Hyper Parameters here Tune if Necessary after interpretation!
+    def generate(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        """Generate response using the fine-tuned model"""
+        import torch
+
+        formatted_input = self.format_prompt(prompt, context=context)
+        inputs = self.tokenizer.encode(formatted_input, return_tensors="pt")
+
+        with torch.no_grad():
+            outputs = self.model.generate(inputs, **self._generate_kwargs(max_tokens, temperature))
+
+        response = self.tokenizer.decode(outputs[0][len(inputs[0]):], skip_special_tokens=True)
+        return response.strip()
+
+    def stream(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        """Yield text deltas from the fine-tuned model as tokens are produced"""
+        import torch
+        from transformers import TextIteratorStreamer
+
+        formatted_input = self.format_prompt(prompt, context=context)
+        inputs = self.tokenizer.encode(formatted_input, return_tensors="pt")
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+        def run_generate():
+            with torch.no_grad():
+                self.model.generate(inputs, streamer=streamer, **self._generate_kwargs(max_tokens, temperature))
+
+        generate_thread = threading.Thread(target=run_generate)
+        generate_thread.daemon = True
+        generate_thread.start()
+        for delta in streamer:
+            yield delta
+        generate_thread.join()
+
+    def batch(self, prompts, max_tokens=512, temperature=0.7, context=None):
+        """One left-padded generate call for all prompts"""
+        import torch
+
+        formatted = [self.format_prompt(prompt, context=context) for prompt in prompts]
+        padding_side = self.tokenizer.padding_side
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        try:
+            inputs = self.tokenizer(formatted, return_tensors="pt", padding=True, add_special_tokens=False)
+        finally:
+            self.tokenizer.padding_side = padding_side
+        inputs = inputs.to(self.model.device)
+
+        with torch.no_grad():
+            outputs = self.model.generate(**inputs, **self._generate_kwargs(max_tokens, temperature))
+
+        prompt_length = inputs["input_ids"].shape[1]
+        return [
+            self.tokenizer.decode(output[prompt_length:], skip_special_tokens=True).strip()
+            for output in outputs
+        ]
+
+    def info(self):
+        return {
+            "backend": self.name,
+            "model_path": self.model_path,
+            "device": str(self.model.device),
+            "precision": self.precision,
+            "mmapped": self.mmapped,
+            "self_check": self.self_check_result
+        }
+
+
+class GGUFBackend(LLMBackend):
+    """Quantized GGUF model on CPU through llama.cpp"""
+    name = "gguf"
+
+    def __init__(self, model_path="visa_officer_gguf", quantization="int4", n_ctx=2048, n_threads=None, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            from llama_cpp import Llama
+        except ImportError as e:
+            raise ImportError("The gguf backend needs llama-cpp-python, install requirements-gguf.txt") from e
+
+        self.quantization = GGUF_QUANTIZATIONS.get(quantization, quantization)
+        self.model_path = self._resolve_model_file(model_path, self.quantization)
+        print(f"Loading GGUF model from {self.model_path}...")
+        self.llama = Llama(
+            model_path=self.model_path,
+            n_ctx=n_ctx,
+            n_threads=n_threads or os.cpu_count(),
+            verbose=False
+        )
+        # A llama.cpp context evaluates one sequence at a time
+        self._lock = threading.Lock()
+        print("GGUF model loaded successfully!")
+
+    @staticmethod
+    def _resolve_model_file(model_path, quantization):
+        """Accept a .gguf file or the export directory, picking the file for the quantization"""
+        if os.path.isfile(model_path):
+            return model_path
+        candidates = sorted(glob.glob(os.path.join(model_path, "*.gguf")))
+        for candidate in candidates:
+            if quantization.lower() in os.path.basename(candidate).lower():
+                return candidate
+        if candidates:
+            names = ", ".join(os.path.basename(candidate) for candidate in candidates)
+            raise FileNotFoundError(f"No {quantization} GGUF model in {model_path} (found {names})")
+        raise FileNotFoundError(f"No GGUF model found at {model_path}")
+
+    def tokenize(self, text):
+        return self.llama.tokenize(text.encode("utf-8"), add_bos=False, special=False)
+
+    def _prompt_tokens(self, prompt, context):
+        # The formatted prompt already carries <|begin_of_text|>, parse it as special tokens
+        return self.llama.tokenize(self.format_prompt(prompt, context=context).encode("utf-8"), add_bos=False, special=True)
+
+    def generate(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        tokens = self._prompt_tokens(prompt, context)
+        with self._lock:
+            output = self.llama.create_completion(tokens, max_tokens=max_tokens, temperature=temperature)
+        return output["choices"][0]["text"].strip()
+
+    def stream(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        tokens = self._prompt_tokens(prompt, context)
+        with self._lock:
+            for chunk in self.llama.create_completion(tokens, max_tokens=max_tokens, temperature=temperature, stream=True):
+                delta = chunk["choices"][0]["text"]
+                if delta:
+                    yield delta
+
+    def info(self):
+        return {"backend": self.name, "model_path": self.model_path, "quantization": self.quantization}
+
+
+class HTTPBackend(LLMBackend):
+    """Local inference server with an OpenAI compatible chat completions API"""
+    name = "http"
+
+    def __init__(self, endpoint="http://localhost:11434/v1", model="llama3", timeout=300, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def count_tokens(self, text):
+        # Servers differ in how (and whether) they expose their tokenizer, estimate instead
+        return approximate_token_count(text)
+
+    def _payload(self, prompt, max_tokens, temperature, context, stream):
+        return {
+            "model": self.model,
+            "messages": self.messages(prompt, context),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream
+        }
+
+    def generate(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        response = self.session.post(
+            f"{self.endpoint}/chat/completions",
+            json=self._payload(prompt, max_tokens, temperature, context, stream=False),
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    def stream(self, prompt, max_tokens=512, temperature=0.7, context=None):
+        with self.session.post(
+            f"{self.endpoint}/chat/completions",
+            json=self._payload(prompt, max_tokens, temperature, context, stream=True),
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                # Server-sent events: "data: {...}" lines ending with "data: [DONE]"
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+    def info(self):
+        return {"backend": self.name, "endpoint": self.endpoint, "model": self.model}
+
+
+BACKENDS = {
+    VisaOfficerLLM.name: VisaOfficerLLM,
+    GGUFBackend.name: GGUFBackend,
+    HTTPBackend.name: HTTPBackend
+}
+
+
+def create_backend(name="transformers", **options):
+    """Instantiate the backend registered under name with its options"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[name](**options)
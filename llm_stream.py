@@ -0,0 +1,58 @@
+"""
+llm_stream.py
+
+Helper shared by the generator modules to consume token streams. When a caller
+passes on_delta and the model can stream, each new piece of text is handed to the
+callback as it is produced; otherwise the model's blocking generate() is used.
+Every call is traced as an "llm_call" span with prompt and output token counts.
+"""
+import time
+
+from tracing import tracer
+
+
+def approximate_token_count(text):
+    """Cheap token estimate when no tokenizer is available (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def count_tokens(llm_model, text):
+    if hasattr(llm_model, "count_tokens"):
+        return llm_model.count_tokens(text)
+    return approximate_token_count(text)
+
+
+def generate_text(llm_model, prompt, max_tokens=512, temperature=0.7, on_delta=None, context=None):
+    """Generate a response, forwarding partial text to on_delta when streaming is possible.
+
+    context is optional session text for the system turn; it is only passed to models
+    that were given one, so plain generate(prompt, ...) models keep working.
+    """
+    kwargs = {"max_tokens": max_tokens, "temperature": temperature}
+    if context is not None:
+        kwargs["context"] = context
+
+    with tracer.span("llm_call", max_tokens=max_tokens, streamed=on_delta is not None) as span:
+        if on_delta is None or not hasattr(llm_model, "stream"):
+            response = llm_model.generate(prompt, **kwargs)
+        else:
+            response = _stream_text(llm_model, prompt, kwargs, on_delta)
+        span.tag(prompt_tokens=count_tokens(llm_model, prompt), output_tokens=count_tokens(llm_model, response))
+    return response
+
+
+def _stream_text(llm_model, prompt, kwargs, on_delta):
+    started = time.perf_counter()
+    chunks = []
+    for delta in llm_model.stream(prompt, **kwargs):
+        if not delta:
+            continue
+        if not chunks:
+            tracer.record("llm_first_token", time.perf_counter() - started)
+        chunks.append(delta)
+        try:
+            on_delta(delta)
+        except Exception as e:
+            # A failing listener must not abort the generation itself
+            print(f"Error forwarding streamed text: {e}")
+    return "".join(chunks).strip()
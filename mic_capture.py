@@ -0,0 +1,203 @@
+"""
+mic_capture.py
+
+Streaming microphone capture for the local CLI interview. PyAudio delivers PCM
+frames on its own thread; each block is resampled to 16 kHz with the streaming
+polyphase resampler and written into a preallocated float32 ring buffer, and an
+incremental energy/zero-crossing VAD runs over the new frames. Whenever the
+candidate pauses, the speech since the last pause is handed out as a segment that
+is a view into the ring buffer, so transcription of the first sentences starts
+while the candidate is still talking and Whisper reads the samples in place.
+"""
+import queue
+import threading
+
+import numpy as np
+
+from audio_conversion import WHISPER_SAMPLE_RATE, StreamingResampler, frame_energy_zcr, pcm_to_numpy
+
+
+class RingBuffer:
+    """Fixed float32 ring buffer whose windows are always contiguous views.
+
+    Every sample is stored twice, at its position and one capacity further, so any
+    window up to capacity samples long can be sliced without wrapping or copying.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=np.float32)
+        self.written = 0
+
+    def write(self, samples):
+        if samples.size > self.capacity:
+            self.written += samples.size - self.capacity
+            samples = samples[-self.capacity:]
+        start = self.written % self.capacity
+        first = min(samples.size, self.capacity - start)
+        for base in (0, self.capacity):
+            self._buffer[base + start:base + start + first] = samples[:first]
+            self._buffer[base:base + samples.size - first] = samples[first:]
+        self.written += samples.size
+
+    def view(self, start, end):
+        """Samples [start, end) by absolute index, as a view into the buffer"""
+        if end > self.written or self.written - start > self.capacity or end < start:
+            raise IndexError(f"Samples {start}:{end} are not in the ring buffer")
+        offset = start % self.capacity
+        return self._buffer[offset:offset + end - start]
+
+
+class MicrophoneCapture:
+    def __init__(self, capacity_seconds=120, frame_ms=30, margin_db=12.0, floor_db=-45.0, zcr_threshold=0.25,
+                 calibration_ms=300, pause_ms=500, end_silence_ms=1500, pad_ms=150, max_segment_seconds=25,
+                 frames_per_buffer=1024):
+        self.frame_length = int(WHISPER_SAMPLE_RATE * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.floor_db = floor_db
+        self.zcr_threshold = zcr_threshold
+        self.calibration_frames = max(1, calibration_ms // frame_ms)
+        self.pause_samples = int(WHISPER_SAMPLE_RATE * pause_ms / 1000)
+        self.end_silence_samples = int(WHISPER_SAMPLE_RATE * end_silence_ms / 1000)
+        self.pad_samples = int(WHISPER_SAMPLE_RATE * pad_ms / 1000)
+        self.max_segment_samples = int(WHISPER_SAMPLE_RATE * max_segment_seconds)
+        self.frames_per_buffer = frames_per_buffer
+        # Segments are handed out as views, the ring must outlive the longest one by a wide margin
+        self.ring = RingBuffer(int(WHISPER_SAMPLE_RATE * max(capacity_seconds, 2 * max_segment_seconds)))
+
+        self._audio = None
+        self._stream = None
+        self._lock = threading.Lock()
+        self._segments = None
+        self.stats = {"segments": 0, "speech_seconds": 0.0, "overruns": 0}
+
+    def _reset(self, timeout_samples):
+        self._resampler = StreamingResampler(self.device_rate, WHISPER_SAMPLE_RATE)
+        self._vad_position = self.ring.written
+        self._listen_start = self.ring.written
+        self._timeout_samples = timeout_samples
+        self._calibration = []
+        self._noise_db = None
+        self._segment_start = None
+        self._last_speech = None
+        self._emitted_end = self.ring.written
+        self._segments = queue.Queue()
+
+    def open(self):
+        import pyaudio
+
+        self._audio = pyaudio.PyAudio()
+        self.device_rate = int(self._audio.get_default_input_device_info()["defaultSampleRate"])
+        self._reset(timeout_samples=None)
+        self._listening = False
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.device_rate,
+            input=True,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._on_audio
+        )
+        return self
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._audio.terminate()
+            self._stream = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        import pyaudio
+
+        if status:
+            self.stats["overruns"] += 1
+        with self._lock:
+            if self._listening:
+                self.ring.write(self._resampler.process(pcm_to_numpy(in_data)))
+                self._detect()
+        return (None, pyaudio.paContinue)
+
+    def _emit(self, start, end):
+        if end > start:
+            self.stats["segments"] += 1
+            self.stats["speech_seconds"] += (end - start) / WHISPER_SAMPLE_RATE
+            self._segments.put((start, end))
+        self._emitted_end = end
+
+    def _finish(self):
+        self._listening = False
+        self._segments.put(None)
+
+    def _detect(self):
+        """Run the VAD over every complete frame written since the last call"""
+        num_frames = (self.ring.written - self._vad_position) // self.frame_length
+        if num_frames <= 0:
+            return
+        frames_start = self._vad_position
+        energy_db, zcr = frame_energy_zcr(
+            self.ring.view(frames_start, frames_start + num_frames * self.frame_length), self.frame_length
+        )
+        self._vad_position += num_frames * self.frame_length
+
+        for index in range(num_frames):
+            start = frames_start + index * self.frame_length
+            end = start + self.frame_length
+            if self._noise_db is None:
+                # Measure the room before judging speech, like Recognizer.adjust_for_ambient_noise
+                self._calibration.append(energy_db[index])
+                if len(self._calibration) >= self.calibration_frames:
+                    self._noise_db = float(np.median(self._calibration))
+                continue
+
+            threshold = max(self._noise_db + self.margin_db, self.floor_db)
+            is_speech = energy_db[index] > threshold or (
+                energy_db[index] > max(threshold - self.margin_db / 2, self.floor_db) and zcr[index] > self.zcr_threshold
+            )
+            if is_speech:
+                if self._segment_start is None:
+                    self._segment_start = max(start - self.pad_samples, self._emitted_end)
+                self._last_speech = end
+            else:
+                # Track slow changes in background noise
+                self._noise_db = 0.95 * self._noise_db + 0.05 * float(energy_db[index])
+
+            if self._segment_start is not None:
+                if not is_speech and end - self._last_speech >= self.pause_samples:
+                    self._emit(self._segment_start, min(self._last_speech + self.pad_samples, end))
+                    self._segment_start = None
+                elif end - self._segment_start >= self.max_segment_samples:
+                    self._emit(self._segment_start, end)
+                    self._segment_start = end
+
+            if self._last_speech is not None and end - self._last_speech >= self.end_silence_samples:
+                if self._segment_start is not None:
+                    self._emit(self._segment_start, min(self._last_speech + self.pad_samples, end))
+                self._finish()
+                return
+            if (self._last_speech is None and self._timeout_samples is not None
+                    and end - self._listen_start >= self._timeout_samples):
+                self._finish()
+                return
+
+    def segments(self, timeout=None):
+        """Yield 16 kHz float32 speech segments of one answer as the candidate pauses.
+
+        Segments are views into the ring buffer, valid until capacity more samples
+        have been captured. Ends after a long silence, or after timeout seconds
+        without any speech.
+        """
+        with self._lock:
+            self._reset(timeout_samples=int(timeout * WHISPER_SAMPLE_RATE) if timeout else None)
+            self._listening = True
+        while True:
+            segment = self._segments.get()
+            if segment is None:
+                return
+            yield self.ring.view(*segment)
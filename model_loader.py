@@ -0,0 +1,109 @@
+"""
+model_loader.py
+
+Background warm-up of the models the app serves with. Each model is registered
+with a load function and loaded on its own thread, so the HTTP server can bind
+and answer readiness probes while weights are still being read. Load functions
+receive a report(fraction) callback for progress; get() blocks until a model is
+ready and re-raises its load error.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ModelLoader:
+    def __init__(self):
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def add(self, name, load_fn):
+        """Register a model; load_fn(report) returns the loaded object"""
+        self._models[name] = {
+            "load_fn": load_fn,
+            "state": "pending",
+            "progress": 0.0,
+            "value": None,
+            "error": None,
+            "started_at": None,
+            "seconds": None,
+            "event": threading.Event()
+        }
+
+    def _load(self, name):
+        entry = self._models[name]
+        entry["state"] = "loading"
+        entry["started_at"] = time.time()
+
+        def report(fraction):
+            entry["progress"] = min(max(float(fraction), 0.0), 1.0)
+
+        try:
+            entry["value"] = entry["load_fn"](report)
+            entry["state"] = "ready"
+            entry["progress"] = 1.0
+        except Exception as e:
+            print(f"Error loading {name}: {e}")
+            entry["error"] = str(e)
+            entry["state"] = "failed"
+        entry["seconds"] = round(time.time() - entry["started_at"], 3)
+        entry["event"].set()
+
+    def start(self):
+        """Start loading every registered model on background threads"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for name in self._models:
+            thread = threading.Thread(target=self._load, args=(name,), name=f"load-{name}")
+            thread.daemon = True
+            thread.start()
+
+    def wait(self, timeout=None):
+        """Block until every model finished loading; returns True when all are ready"""
+        self.start()
+        deadline = None if timeout is None else time.time() + timeout
+        for entry in self._models.values():
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            if not entry["event"].wait(remaining):
+                return False
+        return self.ready()
+
+    def get(self, name, timeout=None):
+        """Return a loaded model, waiting for it if it is still warming up"""
+        self.start()
+        entry = self._models[name]
+        if not entry["event"].wait(timeout):
+            raise TimeoutError(f"{name} is still loading")
+        if entry["state"] == "failed":
+            raise RuntimeError(f"{name} failed to load: {entry['error']}")
+        return entry["value"]
+
+    def is_ready(self, name):
+        return self._models[name]["state"] == "ready"
+
+    def ready(self):
+        return all(entry["state"] == "ready" for entry in self._models.values())
+
+    def status(self):
+        """Overall readiness and per-model state, progress and load time"""
+        models = {
+            name: {
+                "state": entry["state"],
+                "progress": round(entry["progress"], 3),
+                "seconds": entry["seconds"] if entry["seconds"] is not None else (
+                    round(time.time() - entry["started_at"], 3) if entry["started_at"] else None
+                ),
+                "error": entry["error"]
+            }
+            for name, entry in self._models.items()
+        }
+        progress = sum(model["progress"] for model in models.values()) / max(len(models), 1)
+        return {
+            "ready": self.ready(),
+            "started": self._started,
+            "progress": round(progress, 3),
+            "models": models
+        }
@@ -0,0 +1,87 @@
+"""
+prefix_cache.py
+
+LRU cache of past-key-values for shared prompt prefixes. The visa officer system
+prompt, and per session the system prompt plus the filled interview description,
+are encoded once and reused by every later question, follow-up and analysis call
+so only the request specific suffix has to be prefilled.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def _past_bytes(past):
+    """Memory held by a tuple of (key, value) tensors per layer"""
+    return sum(t.numel() * t.element_size() for layer in past for t in layer)
+
+
+class PrefixCache:
+    def __init__(self, max_bytes=512 * 1024 * 1024, max_entries=64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(token_ids):
+        """Hash a token id sequence into a cache key"""
+        return hashlib.sha1(",".join(map(str, token_ids)).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return cached past key values for a prefix, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["hits"] += 1
+            self.hits += 1
+            return entry["past"]
+
+    def put(self, key, past, num_tokens):
+        """Store a prefix, evicting least recently used entries to respect the caps"""
+        size = _past_bytes(past)
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True
+
+            while self._entries and (self.total_bytes + size > self.max_bytes
+                                     or len(self._entries) >= self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted["bytes"]
+                self.evictions += 1
+
+            self._entries[key] = {
+                "past": past,
+                "bytes": size,
+                "num_tokens": num_tokens,
+                "hits": 0
+            }
+            self.total_bytes += size
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
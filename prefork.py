@@ -0,0 +1,202 @@
+"""
+prefork.py
+
+Pre-fork serving: the parent process loads the models once, then forks worker
+processes that each run their own Flask-SocketIO server on a private port. Weights
+(memory-mapped or already in the parent's heap) are shared copy-on-write, so N
+workers cost roughly one copy of the models in RAM.
+
+The parent keeps the public port and acts as a sticky router. Interview sessions
+live in the memory of the worker that started them and their ids carry that
+worker's tag, so every request with a session_id (Socket.IO connections, analysis
+fetches) is sent to the owning worker; requests without one are spread round
+robin. Plain HTTP requests are forwarded with "Connection: close" so a reused
+keep-alive connection can't carry a request to the wrong worker; websocket
+upgrades are piped for their whole lifetime.
+
+Workers are forked and restarted by a single-threaded supervisor process, forked
+before the router starts any threads, so no worker inherits a lock held by
+another thread of its parent.
+"""
+import os
+import re
+import signal
+import socket
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, parse_qs
+
+WORKER_TAG = re.compile(r"_w(\d+)_")
+MAX_HEADER_BYTES = 64 * 1024
+
+
+def worker_tag(index):
+    return f"w{index}"
+
+
+def owning_worker(session_id, workers):
+    """Worker index that owns a session id, from its tag or a stable hash"""
+    match = WORKER_TAG.search(session_id)
+    if match and int(match.group(1)) < workers:
+        return int(match.group(1))
+    return zlib.crc32(session_id.encode("utf-8")) % workers
+
+
+class PreforkServer:
+    def __init__(self, run_worker, workers=2, host="0.0.0.0", port=5000, base_port=5100, before_fork=None):
+        """run_worker(index, port) serves on 127.0.0.1:port in the child and never returns"""
+        self.run_worker = run_worker
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.base_port = base_port
+        self.before_fork = before_fork
+        self._pids = {}
+        self._supervisor_pid = None
+        self._next = 0
+        self._next_lock = threading.Lock()
+        self._stopping = False
+        self.stats = {"connections": 0, "sticky": 0, "round_robin": 0, "errors": 0}
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                # Don't run the supervisor's shutdown handlers in the worker
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+                self.run_worker(index, self.base_port + index)
+            finally:
+                os._exit(0)
+        self._pids[pid] = index
+        print(f"Started worker {index} (pid {pid}) on port {self.base_port + index}")
+
+    def _pick_worker(self, header):
+        request_line = header.split(b"\r\n", 1)[0].decode("latin-1")
+        parts = request_line.split(" ")
+        target = parts[1] if len(parts) > 1 else "/"
+        session_ids = parse_qs(urlsplit(target).query).get("session_id")
+        if session_ids and session_ids[0]:
+            self.stats["sticky"] += 1
+            return owning_worker(session_ids[0], self.workers)
+        self.stats["round_robin"] += 1
+        with self._next_lock:
+            index = self._next
+            self._next = (self._next + 1) % self.workers
+        return index
+
+    @staticmethod
+    def _close_after_response(header):
+        """Force Connection: close on plain HTTP requests, leave websocket upgrades alone"""
+        lines = header.split(b"\r\n")
+        if any(line.lower().startswith(b"upgrade:") for line in lines):
+            return header
+        lines = [line for line in lines if not line.lower().startswith(b"connection:")]
+        lines.insert(1, b"Connection: close")
+        return b"\r\n".join(lines)
+
+    @staticmethod
+    def _pipe(source, destination):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                destination.sendall(data)
+        except OSError:
+            pass
+        finally:
+            try:
+                destination.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+    def _handle(self, client):
+        upstream = None
+        try:
+            buffered = b""
+            while b"\r\n\r\n" not in buffered:
+                data = client.recv(65536)
+                if not data or len(buffered) > MAX_HEADER_BYTES:
+                    return
+                buffered += data
+            header, body = buffered.split(b"\r\n\r\n", 1)
+
+            index = self._pick_worker(header)
+            upstream = socket.create_connection(("127.0.0.1", self.base_port + index))
+            upstream.sendall(self._close_after_response(header) + b"\r\n\r\n" + body)
+
+            reader = threading.Thread(target=self._pipe, args=(upstream, client))
+            reader.daemon = True
+            reader.start()
+            self._pipe(client, upstream)
+            reader.join()
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"Error routing connection: {e}")
+        finally:
+            for sock in (client, upstream):
+                if sock is not None:
+                    sock.close()
+
+    def _stop_workers(self, *_):
+        self._stopping = True
+        for pid in list(self._pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        os._exit(0)
+
+    def _supervise(self):
+        """Fork the workers and restart any that exit; the process never starts a thread"""
+        for index in range(self.workers):
+            self._spawn(index)
+        signal.signal(signal.SIGTERM, self._stop_workers)
+        signal.signal(signal.SIGINT, self._stop_workers)
+
+        while not self._stopping:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                time.sleep(1)
+                continue
+            index = self._pids.pop(pid, None)
+            if index is not None and not self._stopping:
+                print(f"Worker {index} (pid {pid}) exited, restarting")
+                self._spawn(index)
+
+    def stop(self, *_):
+        self._stopping = True
+        if self._supervisor_pid is not None:
+            try:
+                os.kill(self._supervisor_pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        os._exit(0)
+
+    def serve_forever(self):
+        if self.before_fork is not None:
+            self.before_fork()
+        # Fork before the router starts any threads, children only inherit the calling thread
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self._supervise()
+            finally:
+                os._exit(0)
+        self._supervisor_pid = pid
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        listener = socket.create_server((self.host, self.port), reuse_port=False)
+        listener.listen(512)
+        print(f"Routing {self.host}:{self.port} to {self.workers} workers")
+        while True:
+            client, _ = listener.accept()
+            self.stats["connections"] += 1
+            handler = threading.Thread(target=self._handle, args=(client,))
+            handler.daemon = True
+            handler.start()
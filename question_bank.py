@@ -0,0 +1,277 @@
+"""
+question_bank.py
+
+Offline question bank built from the real interview reports in
+data/f1visa_posts_2025-06-20.csv and visa_training_data.jsonl. Visa officer
+questions ("VO: Why this University?") are extracted, deduplicated and indexed as
+hashed word n-gram TF-IDF vectors stored in an inverted index of NumPy arrays, so
+the top-k questions relevant to a resume and course can be retrieved in a few
+milliseconds at serving time.
+
+app.py builds the index on first start when it is missing; rebuild it after the
+corpora change with:
+    python question_bank.py --out data/question_bank.npz
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import re
+import sys
+import zlib
+from collections import Counter
+
+import numpy as np
+
+NUM_FEATURES = 1 << 18
+
+CSV_SOURCE = "data/f1visa_posts_2025-06-20.csv"
+JSONL_SOURCE = "visa_training_data.jsonl"
+DEFAULT_INDEX_PATH = "data/question_bank.npz"
+# Bumped when extraction or filtering changes, older index files are rebuilt
+INDEX_VERSION = 2
+
+# "VO: Why this university?" and the common variants people use in their reports
+VO_QUESTION = re.compile(
+    r"\b(?:VO|V\.O\.?|Visa Officer|Consular Officer|Officer|CO|Interviewer)\s*(?:[:\-–]|\))\s*([^?\n]{3,200}?\?)",
+    re.IGNORECASE
+)
+SPEAKER = re.compile(r"\b(?:VO|Me)\s*:", re.IGNORECASE)
+ASIDE = re.compile(r"\*[^*]*\*|\([^)]*\)")
+# Reddit markdown escapes ("\* What's the purpose...")
+MARKDOWN_ESCAPE = re.compile(r"\\([\\`*_{}\[\]()#+\-.!>])")
+SMALL_TALK = re.compile(r"^(?:(?:hi|hello|good (?:morning|afternoon|evening))\b.*)?how are you", re.IGNORECASE)
+
+# Questions are served to other candidates, so ones naming a school, city or person are dropped.
+# Capitalized words other than these mark a proper noun
+COMMON_CAPITALIZED = {
+    "i", "i'm", "us", "usa", "u.s", "u.s.", "america", "american", "united", "states", "english",
+    "ms", "mba", "phd", "gpa", "cgpa", "gre", "toefl", "ielts", "sat", "sop", "i-20", "i20", "opt", "stem",
+    "master's", "masters", "bachelor's", "bachelors", "ok", "okay"
+}
+# Placeholders people typed instead of their school, or a name dropped and the question left dangling
+PLACEHOLDER = re.compile(
+    r"\[|\bX{1,4}\b|\bXYZ\b|\bABC\b|\bUniversity Name\b|\b(?:going to|choose)\s+\?$|\.\.\.",
+    re.IGNORECASE
+)
+# "why northeastern university", "going to purdue college": a named, lower-cased institution
+NAMED_INSTITUTION = re.compile(
+    r"\b(?!(?:this|the|which|what|other|a|your|that|particular|any|all|same|of)\b)[a-z]+\s+"
+    r"(?:university|college|uni|univ|school|institute)\b",
+    re.IGNORECASE
+)
+# Reports that run several turns together ("... Me- Yes officer VO- ...")
+EMBEDDED_TURN = re.compile(r"\b(?:Me|VO)\s*-|:|&[a-z]+;")
+MIN_QUESTION_WORDS = 4
+MIN_QUESTION_CHARS = 16
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "have", "i", "in", "is", "it",
+    "me", "my", "of", "on", "or", "so", "that", "the", "this", "to", "was", "what", "with", "you", "your"
+}
+
+
+def clean_question(raw):
+    """Reduce a matched officer utterance to a single readable question, or None"""
+    text = MARKDOWN_ESCAPE.sub(r"\1", raw)
+    text = SPEAKER.split(text)[-1]
+    text = ASIDE.sub(" ", text)
+    text = re.split(r"(?<=[.!])\s+", text.strip())[-1]
+    text = " ".join(text.strip(" \"'“”‘’*-,").split())
+    words = text.split()
+    if len(words) < 3 or len(words) > 30 or SMALL_TALK.match(text):
+        return None
+    return text[0].upper() + text[1:]
+
+
+def servable(question):
+    """Whether a question can be asked of any candidate: a full question naming no school, place or person"""
+    words = question.split()
+    if len(words) < MIN_QUESTION_WORDS or len(question) < MIN_QUESTION_CHARS:
+        return False
+    if PLACEHOLDER.search(question) or EMBEDDED_TURN.search(question) or NAMED_INSTITUTION.search(question):
+        return False
+    for position, word in enumerate(words):
+        word = word.strip("?,.!\"'“”‘’()")
+        if word.lower() in COMMON_CAPITALIZED or not word:
+            continue
+        # Acronyms anywhere (SJSU, CMU), capitalized words after the first (Yale, Florida)
+        if (len(word) > 1 and word.isupper()) or (position > 0 and word[0].isupper()):
+            return False
+    return True
+
+
+def extract_questions(text):
+    """Yield cleaned, servable officer questions found in a free-text interview report"""
+    for match in VO_QUESTION.findall(text or ""):
+        question = clean_question(match)
+        if question and servable(question):
+            yield question
+
+
+def iter_corpus(csv_path=CSV_SOURCE, jsonl_path=JSONL_SOURCE):
+    """Yield the raw report texts from both corpora"""
+    csv.field_size_limit(sys.maxsize)
+    with open(csv_path, "r", encoding="utf-8") as csv_file:
+        for row in csv.DictReader(csv_file):
+            yield f"{row.get('title', '')}\n{row.get('selftext', '')}"
+
+    with open(jsonl_path, "r", encoding="utf-8") as jsonl_file:
+        for line in jsonl_file:
+            line = line.strip()
+            if not line:
+                continue
+            for message in json.loads(line).get("messages", []):
+                if message.get("role") == "assistant":
+                    yield message.get("content", "")
+
+
+def tokenize(text):
+    words = [word for word in re.findall(r"[a-z0-9]+", (text or "").lower()) if word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def hash_features(text):
+    """Counts of hashed unigram and bigram features; crc32 keeps hashes stable across processes"""
+    return Counter(zlib.crc32(token.encode("utf-8")) % NUM_FEATURES for token in tokenize(text))
+
+
+def build_index(questions, counts):
+    """Build an inverted TF-IDF index (feature -> documents) over the questions"""
+    doc_features = [hash_features(question) for question in questions]
+    num_docs = len(questions)
+
+    doc_freq = np.zeros(NUM_FEATURES, dtype=np.int32)
+    for features in doc_features:
+        for feature in features:
+            doc_freq[feature] += 1
+    idf = (np.log((num_docs + 1) / (doc_freq + 1)) + 1.0).astype(np.float32)
+
+    postings = [[] for _ in range(NUM_FEATURES)]
+    for doc_id, features in enumerate(doc_features):
+        weights = {feature: (1.0 + math.log(count)) * idf[feature] for feature, count in features.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        for feature, weight in weights.items():
+            postings[feature].append((doc_id, weight / norm))
+
+    feature_ptr = np.zeros(NUM_FEATURES + 1, dtype=np.int32)
+    feature_ptr[1:] = np.cumsum([len(posting) for posting in postings])
+    doc_ids = np.array([doc_id for posting in postings for doc_id, _ in posting], dtype=np.int32)
+    weights = np.array([weight for posting in postings for _, weight in posting], dtype=np.float32)
+
+    return {
+        "version": np.array(INDEX_VERSION),
+        "questions": np.array(json.dumps(questions)),
+        "counts": np.array(counts, dtype=np.int32),
+        "idf": idf,
+        "feature_ptr": feature_ptr,
+        "doc_ids": doc_ids,
+        "weights": weights
+    }
+
+
+def build_question_bank(out_path=DEFAULT_INDEX_PATH, csv_path=CSV_SOURCE, jsonl_path=JSONL_SOURCE):
+    """Extract officer questions from the corpora and write the index to out_path"""
+    counts = Counter()
+    canonical = {}
+    for text in iter_corpus(csv_path, jsonl_path):
+        for question in extract_questions(text):
+            key = " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+            canonical.setdefault(key, question)
+            counts[key] += 1
+
+    keys = [key for key, _ in counts.most_common()]
+    questions = [canonical[key] for key in keys]
+    index = build_index(questions, [counts[key] for key in keys])
+    # Write next to the target and rename, so a concurrently starting process never loads half a file
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as index_file:
+        np.savez_compressed(index_file, **index)
+    os.replace(tmp_path, out_path)
+    print(f"Indexed {len(questions)} questions into {out_path}")
+    return len(questions)
+
+
+class QuestionBank:
+    def __init__(self, questions, counts, idf, feature_ptr, doc_ids, weights, popularity_weight=0.05):
+        self.questions = questions
+        self.counts = counts
+        self.idf = idf
+        self.feature_ptr = feature_ptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        # Questions reported by many candidates get a small boost
+        self.prior = popularity_weight * np.log1p(counts).astype(np.float32)
+
+    @staticmethod
+    def is_current(path=DEFAULT_INDEX_PATH):
+        """Whether the index at path was built by this version of the extraction"""
+        with np.load(path) as data:
+            return "version" in data.files and int(data["version"]) == INDEX_VERSION
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with np.load(path) as data:
+            return cls(
+                json.loads(str(data["questions"])),
+                data["counts"],
+                data["idf"],
+                data["feature_ptr"],
+                data["doc_ids"],
+                data["weights"]
+            )
+
+    def __len__(self):
+        return len(self.questions)
+
+    def search(self, query, k=5, exclude=()):
+        """Return the top-k (question, score) pairs for a free-text query"""
+        scores = self.prior.copy()
+        features = hash_features(query)
+        if features:
+            query_weights = {feature: (1.0 + math.log(count)) * self.idf[feature] for feature, count in features.items()}
+            norm = math.sqrt(sum(weight * weight for weight in query_weights.values())) or 1.0
+            for feature, query_weight in query_weights.items():
+                start, end = self.feature_ptr[feature], self.feature_ptr[feature + 1]
+                if start != end:
+                    np.add.at(scores, self.doc_ids[start:end], self.weights[start:end] * (query_weight / norm))
+
+        excluded = {" ".join(question.lower().split()) for question in exclude}
+        k_candidates = min(len(scores), k + len(excluded))
+        if k_candidates == 0:
+            return []
+        top = np.argpartition(-scores, k_candidates - 1)[:k_candidates]
+        top = top[np.argsort(-scores[top])]
+        results = [
+            (self.questions[doc_id], float(scores[doc_id])) for doc_id in top
+            if " ".join(self.questions[doc_id].lower().split()) not in excluded
+        ]
+        return results[:k]
+
+    def questions_for(self, resume, course="", university="", k=5):
+        """Top-k questions relevant to a resume and the course and university applied for"""
+        resume_text = " ".join(_flatten_strings(resume))
+        # Course and university matter most, repeat them to weight them over the resume
+        query = f"{course} {course} {university} {university} university course study {resume_text}"
+        return [question for question, _ in self.search(query, k=k)]
+
+
+def _flatten_strings(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _flatten_strings(item)
+    elif isinstance(value, str):
+        yield value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the visa officer question bank index")
+    parser.add_argument("--out", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--csv", default=CSV_SOURCE)
+    parser.add_argument("--jsonl", default=JSONL_SOURCE)
+    args = parser.parse_args()
+    build_question_bank(args.out, args.csv, args.jsonl)
@@ -0,0 +1,149 @@
+"""
+question_cache.py
+
+Cache of generated interview questions keyed by the normalized filled interview
+prompt (embassy, country, course, university) and a canonical fingerprint of the
+resume. Each key holds a pool of generated questions; hits are served from memory
+or from an optional on-disk tier, with TTL and LRU eviction. The diversity knob
+lets repeat practice runs draw different questions from the pool and occasionally
+regenerate so the pool keeps growing.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Lower case and collapse whitespace so formatting differences share a key"""
+    return " ".join((text or "").lower().split())
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {normalize_text(str(k)): _canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, str):
+        return normalize_text(value)
+    return value
+
+
+def resume_fingerprint(resume):
+    """Stable hash of a resume regardless of key order, case and whitespace"""
+    canonical = json.dumps(_canonical(resume), sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class QuestionCache:
+    def __init__(self, ttl_seconds=24 * 3600, max_entries=512, disk_dir=None, pool_size=20, diversity=0.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.pool_size = pool_size
+        self.diversity = diversity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "diversity_misses": 0, "evictions": 0}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(description, resume):
+        prompt_hash = hashlib.sha1(normalize_text(description).encode("utf-8")).hexdigest()
+        return hashlib.sha1(f"{prompt_hash}:{resume_fingerprint(resume)}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _save_to_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        try:
+            with open(self._disk_path(key), 'w', encoding='utf-8') as cache_file:
+                json.dump(entry, cache_file)
+        except OSError as e:
+            print(f"Error writing question cache: {e}")
+
+    def get(self, key, number_of_questions):
+        """Return number_of_questions cached questions, or None when they should be generated"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+        from_disk = False
+        if entry is None:
+            entry = self._load_from_disk(key)
+            from_disk = entry is not None
+
+        with self._lock:
+            if entry is None or len(entry["questions"]) < number_of_questions:
+                self.stats["misses"] += 1
+                return None
+
+            # Occasionally regenerate so the pool keeps growing for repeat candidates
+            if len(entry["questions"]) < self.pool_size and random.random() < self.diversity:
+                self.stats["diversity_misses"] += 1
+                return None
+
+            if from_disk:
+                self._entries[key] = entry
+                self.stats["disk_hits"] += 1
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+
+            if self.diversity > 0:
+                return random.sample(entry["questions"], number_of_questions)
+            return entry["questions"][:number_of_questions]
+
+    def put(self, key, questions):
+        """Add generated questions to the pool of a key"""
+        questions = [question for question in questions if question]
+        if not questions:
+            return
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"created": time.time(), "questions": []}
+            known = {normalize_text(question) for question in entry["questions"]}
+            for question in questions:
+                if normalize_text(question) not in known and len(entry["questions"]) < self.pool_size:
+                    entry["questions"].append(question)
+                    known.add(normalize_text(question))
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            snapshot = {"created": entry["created"], "questions": list(entry["questions"])}
+
+        self._save_to_disk(key, snapshot)
+
+    def cache_stats(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
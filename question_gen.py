@@ -1,8 +1,126 @@
 import re
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from llm_stream import generate_text, count_tokens
+from tracing import tracer
 
-def generate_custom_questions(number_of_questions, description, candidate_resume, llm_model):
-    """Generate custom questions using the fine-tuned model"""
+# Output budget of a single rewrite in the retrieve_rewrite strategy
+REWRITE_MAX_TOKENS = 60
+
+# Used to top up a short generated list
+FALLBACK_QUESTIONS = [
+    "Why do you want to visit the United States?",
+    "How will you fund your stay in the US?",
+    "What ties do you have to your home country?",
+    "What are your plans after completing your studies/visit?",
+    "Can you explain any gaps in your educational or employment history?"
+]
+
+# Returned when generation fails entirely
+DEFAULT_QUESTIONS = [
+    "What is the purpose of your visit to the United States?",
+    "How long do you plan to stay in the US?",
+    "What are your educational qualifications?",
+    "How will you finance your studies/stay in the US?",
+    "What are your future career plans after your visit?"
+]
+
+def retrieve_fallback_questions(question_bank, candidate_resume, course, university, k, fallbacks=FALLBACK_QUESTIONS):
+    """Real officer questions from the question bank followed by the generic fallbacks"""
+    if question_bank is None:
+        return list(fallbacks)
+    return question_bank.questions_for(candidate_resume, course=course, university=university, k=k) + fallbacks
+
+
+def _top_up(questions, candidates, number_of_questions):
+    """Append candidates not asked yet until there are number_of_questions"""
+    for candidate in candidates:
+        if len(questions) >= number_of_questions:
+            break
+        if candidate not in questions:
+            questions.append(candidate)
+    return questions[:number_of_questions]
+
+
+def _record_metrics(metrics, llm_model, strategy, started, prompts, outputs, max_new_tokens):
+    if metrics is None:
+        return
+    metrics.update({
+        "strategy": strategy,
+        "latency_seconds": round(time.perf_counter() - started, 3),
+        "llm_calls": len(prompts),
+        "max_new_tokens": max_new_tokens,
+        "prompt_tokens": sum(count_tokens(llm_model, prompt) for prompt in prompts),
+        "completion_tokens": sum(count_tokens(llm_model, output) for output in outputs)
+    })
+
+
+def _rewrite_question(question, resume_summary, llm_model, context):
+    """Lightly personalize one retrieved question, keeping the original if the rewrite is unusable"""
+    prompt = f"""As a visa officer, rewrite this interview question so it fits the applicant. Keep its intent and keep it to one short question.
+
+Question: {question}
+
+Applicant background: {resume_summary}
+
+Rewritten question:"""
+
+    try:
+        response = generate_text(llm_model, prompt, max_tokens=REWRITE_MAX_TOKENS, temperature=0.5, context=context)
+    except Exception as e:
+        print(f"Error rewriting question: {e}")
+        return prompt, question, ""
+
+    lines = [line.strip() for line in response.strip().split('\n') if line.strip()]
+    rewritten = re.sub(r'^(Rewritten question:|Question:)', '', lines[0], flags=re.IGNORECASE).strip() if lines else ""
+    rewritten = rewritten.strip('"').strip()
+    if len(rewritten) <= 10:
+        return prompt, question, response
+    if not rewritten.endswith('?'):
+        rewritten += '?'
+    return prompt, rewritten, response
+
+
+@tracer.traced("question_rewrite")
+def rewrite_retrieved_questions(number_of_questions, candidate_resume, llm_model, question_bank, course="",
+                                university="", context=None, metrics=None):
+    """Retrieve relevant officer questions and have the model only personalize them"""
+    started = time.perf_counter()
+    candidates = _top_up([], retrieve_fallback_questions(question_bank, candidate_resume, course, university,
+                                                         number_of_questions), number_of_questions)
+
+    # Short, independent calls are issued together so the inference backend batches them
+    resume_summary = json.dumps(candidate_resume, separators=(",", ":"))[:1500]
+    with ThreadPoolExecutor(max_workers=max(len(candidates), 1)) as executor:
+        results = list(executor.map(
+            tracer.propagate(lambda question: _rewrite_question(question, resume_summary, llm_model, context)),
+            candidates
+        ))
+
+    _record_metrics(metrics, llm_model, "retrieve_rewrite", started,
+                    [prompt for prompt, _, _ in results], [output for _, _, output in results], REWRITE_MAX_TOKENS)
+    questions = [question for _, question, _ in results][:number_of_questions]
+    if metrics is not None:
+        # Unusable rewrites fall back to the retrieved question itself
+        metrics["generated"] = [question for question, candidate in zip(questions, candidates) if question != candidate]
+    return questions
+
+
+@tracer.traced("question_generation")
+def generate_custom_questions(number_of_questions, description, candidate_resume, llm_model, on_delta=None, context=None,
+                              question_bank=None, strategy="generate", metrics=None, course="", university=""):
+    """Generate custom questions using the fine-tuned model, streaming text to on_delta if given.
+
+    strategy "retrieve_rewrite" personalizes questions from question_bank instead of
+    generating them from scratch. If metrics is a dict it receives latency and token counts,
+    and under "generated" the returned questions the model produced (not fallbacks).
+    course and university, when known, select the question bank entries used.
+    """
+    if strategy == "retrieve_rewrite" and question_bank is not None and len(question_bank):
+        return rewrite_retrieved_questions(number_of_questions, candidate_resume, llm_model, question_bank,
+                                           course=course, university=university, context=context, metrics=metrics)
+    started = time.perf_counter()
 
     # Create a comprehensive prompt for question generation
     prompt = f"""As a visa officer, generate {number_of_questions} specific and relevant interview questions based on the following information:
@@ -24,7 +142,9 @@ Return only the questions, numbered 1-{number_of_questions}, one per line."""
 
     try:
         # Use the fine-tuned model's generate method
-        response = llm_model.generate(prompt, max_tokens=800, temperature=0.7)
+        response = generate_text(llm_model, prompt, max_tokens=800, temperature=0.7, on_delta=on_delta,
+                                 context=context)
+        _record_metrics(metrics, llm_model, "generate", started, [prompt], [response], 800)
 
         # Parse the response to extract questions
         questions = []
@@ -38,33 +158,16 @@ Return only the questions, numbered 1-{number_of_questions}, one per line."""
                 question = re.sub(r'^[\-\*\s]+', '', question)
                 if question.endswith('?') or len(question) > 20:
                     questions.append(question)
+        if metrics is not None:
+            metrics["generated"] = questions[:number_of_questions]
 
         # Ensure we have the requested number of questions
-        if len(questions) < number_of_questions:
-            # Add fallback questions if needed
-            fallback_questions = [
-                "Why do you want to visit the United States?",
-                "How will you fund your stay in the US?",
-                "What ties do you have to your home country?",
-                "What are your plans after completing your studies/visit?",
-                "Can you explain any gaps in your educational or employment history?"
-            ]
-
-            for fallback in fallback_questions:
-                if len(questions) >= number_of_questions:
-                    break
-                if fallback not in questions:
-                    questions.append(fallback)
-
-        return questions[:number_of_questions]
+        return _top_up(questions, retrieve_fallback_questions(question_bank, candidate_resume, course, university,
+                                                              number_of_questions), number_of_questions)
 
     except Exception as e:
         print(f"Error generating questions: {e}")
         # Return default questions as fallback
-        return [
-                   "What is the purpose of your visit to the United States?",
-                   "How long do you plan to stay in the US?",
-                   "What are your educational qualifications?",
-                   "How will you finance your studies/stay in the US?",
-                   "What are your future career plans after your visit?"
-               ][:number_of_questions]
+        return _top_up([], retrieve_fallback_questions(question_bank, candidate_resume, course, university,
+                                                       number_of_questions, fallbacks=DEFAULT_QUESTIONS),
+                       number_of_questions)
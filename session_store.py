@@ -0,0 +1,157 @@
+"""
+session_store.py
+
+Bounded store for interview sessions. Behaves like the dict app.py used before,
+but finished sessions are evicted after a TTL, in LRU order when the session count
+or the estimated memory held by sessions exceeds its cap, and completed sessions
+can be handed to an archival hook before they leave memory. Sessions that are
+still active are never evicted.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _snapshot(container):
+    """Copy the items of a container that handler threads may be changing meanwhile"""
+    while True:
+        try:
+            # One C level copy, no other thread runs in between
+            return list(container.items()) if isinstance(container, dict) else list(container)
+        except RuntimeError:
+            # Changed size mid-copy, take it again
+            continue
+
+
+def estimate_bytes(obj, seen=None):
+    """Rough deep size of the plain Python data held by a session.
+
+    Objects that hold buffers (e.g. the live transcriber's audio) report them
+    through __sizeof__.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_bytes(k, seen) + estimate_bytes(v, seen) for k, v in _snapshot(obj))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_bytes(item, seen) for item in _snapshot(obj))
+    return size
+
+
+class SessionStore:
+    def __init__(self, ttl_seconds=3600, max_sessions=1000, max_bytes=256 * 1024 * 1024, on_archive=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.on_archive = on_archive
+        self._sessions = OrderedDict()
+        self._meta = {}
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        self.evictions = {"ttl": 0, "lru": 0, "memory": 0}
+        self.archived = 0
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._sessions
+
+    def __getitem__(self, session_id):
+        with self._lock:
+            session = self._sessions[session_id]
+            self._sessions.move_to_end(session_id)
+            self._meta[session_id]["last_access"] = time.time()
+            return session
+
+    def __setitem__(self, session_id, session):
+        with self._lock:
+            if session_id in self._sessions:
+                self.total_bytes -= self._meta[session_id]["bytes"]
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            size = estimate_bytes(session)
+            self._meta[session_id] = {"last_access": time.time(), "bytes": size, "created": time.time()}
+            self.total_bytes += size
+        self.evict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id, default=None):
+        try:
+            return self[session_id]
+        except KeyError:
+            return default
+
+    def pop(self, session_id, default=None):
+        with self._lock:
+            if session_id not in self._sessions:
+                return default
+            self.total_bytes -= self._meta.pop(session_id)["bytes"]
+            return self._sessions.pop(session_id)
+
+    def touch(self, session_id):
+        """Re-measure a session after it changed and apply the eviction policy"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            meta = self._meta[session_id]
+            size = estimate_bytes(session)
+            self.total_bytes += size - meta["bytes"]
+            meta["bytes"] = size
+            meta["last_access"] = time.time()
+            self._sessions.move_to_end(session_id)
+        self.evict()
+
+    def _oldest_inactive(self):
+        for session_id, session in self._sessions.items():
+            if not session.get("active", False):
+                return session_id
+        return None
+
+    def evict(self):
+        """Drop expired sessions, then least recently used ones while over a cap"""
+        removed = []
+        with self._lock:
+            now = time.time()
+            for session_id, session in list(self._sessions.items()):
+                if (not session.get("active", False)
+                        and now - self._meta[session_id]["last_access"] > self.ttl_seconds):
+                    removed.append((session_id, self.pop(session_id)))
+                    self.evictions["ttl"] += 1
+
+            while len(self._sessions) > self.max_sessions or self.total_bytes > self.max_bytes:
+                reason = "lru" if len(self._sessions) > self.max_sessions else "memory"
+                session_id = self._oldest_inactive()
+                if session_id is None:
+                    break
+                removed.append((session_id, self.pop(session_id)))
+                self.evictions[reason] += 1
+
+        # Archive outside the lock, the hook may do disk I/O
+        for session_id, session in removed:
+            if self.on_archive is not None and session.get("completed", False):
+                try:
+                    self.on_archive(session_id, session)
+                    self.archived += 1
+                except Exception as e:
+                    print(f"Error archiving session {session_id}: {e}")
+        return len(removed)
+
+    def stats(self):
+        with self._lock:
+            active = sum(1 for session in self._sessions.values() if session.get("active", False))
+            return {
+                "sessions": len(self._sessions),
+                "active_sessions": active,
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": dict(self.evictions),
+                "archived": self.archived
+            }
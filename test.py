@@ -5,6 +5,7 @@ from extract_SW import add_strengths_and_weaknesses_to_portfolio
 from question_gen import generate_custom_questions
 from read_file_json import read_file, read_json
 from audio_conversion import speech_to_text
+from mic_capture import MicrophoneCapture
 from analyzeSW import analyze_strengths_and_weaknesses
 from follow_up_gen import generate_follow_up
 from langchain_ollama import OllamaLLM
@@ -29,6 +30,8 @@ def interview_module():
     "Main function to conduct the interview process."
     llm = OllamaLLM(model="llama3")
     whisper_model = whisper.load_model("base")
+    # One microphone stream for the whole interview, answers are transcribed while they are spoken
+    mic = MicrophoneCapture().open()
 
     job_description = read_file('jd.txt')
 
@@ -45,7 +48,7 @@ def interview_module():
         time.sleep(8)
         answer = None
         while not answer:  # Keep listening until valid answer is received
-            answer = speech_to_text(whisper_model)
+            answer = speech_to_text(whisper_model, capture=mic)
         store_interview(question, answer)
 
         # Generate follow-up question and retrieve answer
@@ -55,7 +58,7 @@ def interview_module():
         # Ask for follow-up answer
         follow_up_answer = None
         while not follow_up_answer:  # Keep listening until valid follow-up answer is received
-            follow_up_answer = speech_to_text(whisper_model)
+            follow_up_answer = speech_to_text(whisper_model, capture=mic)
 
         store_interview(follow_up_question, follow_up_answer)
 
@@ -72,6 +75,7 @@ def interview_module():
         print("Moving on...\n")
 
         # After all questions are answered, analyze strengths and weaknesses
+    mic.close()
     strengths_weaknesses_analysis = analyze_strengths_and_weaknesses(interview_data, llm)
     portfolio_file = 'portfolio.json'
     add_strengths_and_weaknesses_to_portfolio(portfolio_file, strengths_weaknesses_analysis)
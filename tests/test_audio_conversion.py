@@ -0,0 +1,82 @@
+"""
+Polyphase resampling, in one call and chunk by chunk, and the energy/zero-crossing
+speech detector, on synthetic signals.
+"""
+import numpy as np
+
+from audio_conversion import (
+    StreamingResampler, pack_speech, resample_audio, speech_regions, WHISPER_SAMPLE_RATE
+)
+
+
+def test_streaming_resampler_matches_batch():
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, 44100).astype(np.float32)
+    expected = resample_audio(audio, 44100, WHISPER_SAMPLE_RATE)
+
+    resampler = StreamingResampler(44100, WHISPER_SAMPLE_RATE)
+    pieces = []
+    start = 0
+    # Uneven chunks, including ones shorter than the filter
+    for size in (1, 7, 100, 4410, 333, 20000):
+        pieces.append(resampler.process(audio[start:start + size]))
+        start += size
+    pieces.append(resampler.process(audio[start:]))
+    pieces.append(resampler.flush())
+    streamed = np.concatenate(pieces)
+
+    assert streamed.size == expected.size == 16000
+    np.testing.assert_allclose(streamed, expected, atol=1e-6)
+
+
+def test_resampling_keeps_a_tone_in_band():
+    t = np.arange(48000) / 48000
+    tone = np.sin(2 * np.pi * 440 * t).astype(np.float32)
+    resampled = resample_audio(tone, 48000, WHISPER_SAMPLE_RATE)
+
+    spectrum = np.abs(np.fft.rfft(resampled))
+    peak_hz = np.argmax(spectrum) * WHISPER_SAMPLE_RATE / resampled.size
+    assert abs(peak_hz - 440) < 2
+
+
+def test_speech_regions_find_the_spoken_part():
+    rng = np.random.default_rng(1)
+    rate = WHISPER_SAMPLE_RATE
+    audio = rng.normal(0, 1e-4, 3 * rate).astype(np.float32)
+    t = np.arange(rate) / rate
+    audio[rate:2 * rate] += 0.3 * np.sin(2 * np.pi * 220 * t)
+
+    regions = speech_regions(audio, sample_rate=rate, pad_ms=0)
+
+    assert len(regions) == 1
+    start, end = regions[0]
+    # Frame granularity is 30 ms
+    assert abs(start - rate) <= 0.03 * rate
+    assert abs(end - 2 * rate) <= 0.03 * rate
+
+
+def test_speech_regions_bridge_short_gaps_and_drop_blips():
+    rate = WHISPER_SAMPLE_RATE
+    audio = np.zeros(4 * rate, dtype=np.float32)
+    t = np.arange(rate) / rate
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t).astype(np.float32)
+    audio[:rate // 2] = tone[:rate // 2]
+    # 200 ms pause, shorter than max_gap_ms
+    audio[int(0.7 * rate):int(1.5 * rate)] = tone[:int(0.8 * rate)]
+    # 60 ms blip, shorter than min_speech_ms
+    audio[3 * rate:int(3.06 * rate)] = tone[:int(0.06 * rate)]
+
+    regions = speech_regions(audio, sample_rate=rate, pad_ms=0)
+
+    assert len(regions) == 1
+    assert regions[0][0] == 0
+    assert abs(regions[0][1] - 1.5 * rate) <= 0.03 * rate
+
+
+def test_silence_has_no_speech():
+    assert speech_regions(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32)) == []
+
+
+def test_pack_speech_cuts_at_silences_within_the_limit():
+    regions = [(0, 100), (150, 250), (300, 700)]
+    assert pack_speech(regions, max_samples=300) == [(0, 250), (300, 600), (600, 700)]
@@ -0,0 +1,139 @@
+"""
+Continuous batching in InferenceScheduler, driven step by step with a fake model
+whose next token is always the previous token plus one.
+"""
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+import inference_scheduler
+from inference_scheduler import InferenceScheduler
+
+VOCAB_SIZE = 100
+EOS_TOKEN_ID = VOCAB_SIZE - 1
+
+
+class FakeTokenizer:
+    pad_token = "<pad>"
+    pad_token_id = 0
+    eos_token = "<eos>"
+    eos_token_id = EOS_TOKEN_ID
+
+    def __call__(self, text):
+        return {"input_ids": [int(token) for token in text.split()]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(token) for token in ids)
+
+
+class FakeModel:
+    device = torch.device("cpu")
+
+    def __call__(self, input_ids, past_key_values=None, use_cache=True, **kwargs):
+        keys = input_ids.float()[:, None, :, None]
+        if past_key_values is not None:
+            keys = torch.cat([past_key_values[0][0], keys], dim=2)
+        logits = torch.zeros(*input_ids.shape, VOCAB_SIZE)
+        logits[:, -1, :].scatter_(1, (input_ids[:, -1:] + 1) % VOCAB_SIZE, 1.0)
+        return SimpleNamespace(logits=logits, past_key_values=((keys, keys),))
+
+
+class FakeLLM:
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+        self.model = FakeModel()
+
+    def format_prompt(self, prompt, context=None):
+        return prompt
+
+
+def make_request(prompt, max_tokens):
+    return {
+        "prompt": prompt,
+        "max_tokens": max_tokens,
+        "temperature": 0.0,
+        "future": Future(),
+        "deltas": None,
+        "context": None,
+        "submitted_at": time.time()
+    }
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    # Keep the fake model's past as plain tuples
+    monkeypatch.setattr(inference_scheduler, "DynamicCache", None)
+    return InferenceScheduler(FakeLLM())
+
+
+def run_until_idle(scheduler):
+    while scheduler._active:
+        scheduler._decode_step()
+        scheduler._collect_finished()
+
+
+def test_single_request(scheduler):
+    request = make_request("10", max_tokens=4)
+    scheduler._admit([request])
+    run_until_idle(scheduler)
+    assert request["future"].result() == "11 12 13 14"
+
+
+def test_admission_mid_decode_keeps_running_sequences_intact(scheduler):
+    running = make_request("10", max_tokens=5)
+    scheduler._admit([running])
+    scheduler._decode_step()
+    scheduler._collect_finished()
+
+    joining = make_request("50 51", max_tokens=3)
+    scheduler._admit([joining])
+    assert len(scheduler._active) == 2
+    run_until_idle(scheduler)
+
+    assert running["future"].result() == "11 12 13 14 15"
+    assert joining["future"].result() == "52 53 54"
+
+
+def test_request_finishing_at_prefill_is_not_merged(scheduler):
+    running = make_request("10", max_tokens=3)
+    scheduler._admit([running])
+
+    short = make_request("20", max_tokens=1)
+    scheduler._admit([short])
+    assert short["future"].result() == "21"
+    assert scheduler._active == [running]
+
+    run_until_idle(scheduler)
+    assert running["future"].result() == "11 12 13"
+
+
+def test_sampling_stays_within_top_k():
+    llm = FakeLLM()
+    llm.model.generation_config = SimpleNamespace(top_k=3, top_p=1.0)
+    scheduler = InferenceScheduler(llm)
+
+    torch.manual_seed(0)
+    logits = torch.randn(4, VOCAB_SIZE)
+    allowed = logits.topk(3, dim=-1).indices
+    temperatures = torch.full((4,), 5.0)
+    for _ in range(200):
+        tokens = scheduler._sample(logits, temperatures)
+        assert (allowed == tokens[:, None]).any(dim=-1).all()
+
+
+def test_sampling_stays_within_top_p():
+    llm = FakeLLM()
+    llm.model.generation_config = SimpleNamespace(top_k=0, top_p=0.5)
+    scheduler = InferenceScheduler(llm)
+
+    logits = torch.zeros(2, VOCAB_SIZE)
+    # Token 7 alone holds well over half of the mass in the first row
+    logits[0, 7] = 10.0
+    temperatures = torch.ones(2)
+    for _ in range(100):
+        tokens = scheduler._sample(logits, temperatures)
+        assert tokens[0] == 7
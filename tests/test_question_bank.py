@@ -0,0 +1,70 @@
+"""
+QuestionBank retrieval over a small hand-made index, and the filter that keeps
+questions naming a school or a person out of it.
+"""
+import numpy as np
+import pytest
+
+from question_bank import QuestionBank, build_index, extract_questions, servable
+
+QUESTIONS = [
+    "Why did you choose this university?",
+    "Who is sponsoring your education?",
+    "What are your plans after completing your masters?",
+    "How much is your annual tuition fee?",
+    "Do you have any relatives in the United States?",
+    "Why do you want to study computer science?",
+]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    path = tmp_path / "bank.npz"
+    np.savez_compressed(path, **build_index(QUESTIONS, [1] * len(QUESTIONS)))
+    assert QuestionBank.is_current(path)
+    return QuestionBank.load(path)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("who will sponsor your studies", "Who is sponsoring your education?"),
+    ("plans after you complete the masters degree", "What are your plans after completing your masters?"),
+    ("tuition fee for one year", "How much is your annual tuition fee?"),
+    ("relatives living in the states", "Do you have any relatives in the United States?"),
+])
+def test_relevant_question_ranks_first(bank, query, expected):
+    assert bank.search(query, k=3)[0][0] == expected
+
+
+def test_exclude_skips_questions_already_asked(bank):
+    results = bank.search("who will sponsor your studies", k=2, exclude=["who is SPONSORING your education?"])
+    assert "Who is sponsoring your education?" not in [question for question, _ in results]
+    assert len(results) == 2
+
+
+def test_questions_for_weights_course_and_university(bank):
+    resume = {"Skills": ["Python"], "Experience": "Two years as a developer"}
+    questions = bank.questions_for(resume, course="computer science", k=2)
+    assert questions[0] == "Why do you want to study computer science?"
+
+
+def test_popularity_breaks_ties(tmp_path):
+    path = tmp_path / "bank.npz"
+    np.savez_compressed(path, **build_index(["Why this course?", "Why, this course?"], [1, 50]))
+    bank = QuestionBank.load(path)
+    assert bank.search("course", k=1)[0][0] == "Why, this course?"
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Why did you choose this university?", True),
+    ("Why did you choose Arizona State University?", False),
+    ("Why not SJSU instead?", False),
+    ("Why Boston?", False),
+    ("Which university are you going to ?", False),
+])
+def test_servable(question, expected):
+    assert servable(question) is expected
+
+
+def test_extract_questions_keeps_only_servable_officer_questions():
+    report = "VO: Why did you choose this university? Me: Ranking. VO: Why not Stanford University?"
+    assert list(extract_questions(report)) == ["Why did you choose this university?"]
@@ -0,0 +1,73 @@
+"""
+QuestionCache: keys that ignore formatting, pooled questions, TTL and LRU
+eviction, and the on-disk tier.
+"""
+import time
+
+from question_cache import QuestionCache
+
+RESUME = {"Name": "Asha", "Skills": ["Python", "SQL"], "Education": {"Degree": "BTech"}}
+QUESTIONS = ["Why this course?", "Who is sponsoring you?", "What will you do after graduating?"]
+
+
+def test_key_ignores_case_whitespace_and_key_order():
+    reordered = {"education": {"degree": "btech"}, "skills": ["python", " SQL "], "name": "ASHA"}
+    assert (QuestionCache.key("Student  visa, USA", RESUME)
+            == QuestionCache.key("student visa, usa", reordered))
+    assert QuestionCache.key("Student visa, USA", RESUME) != QuestionCache.key("Student visa, UK", RESUME)
+
+
+def test_hit_needs_enough_pooled_questions():
+    cache = QuestionCache()
+    key = QuestionCache.key("Student visa", RESUME)
+    assert cache.get(key, 2) is None
+
+    cache.put(key, QUESTIONS[:2])
+    assert cache.get(key, 2) == QUESTIONS[:2]
+    assert cache.get(key, 3) is None
+
+    # Duplicates up to formatting are not pooled twice
+    cache.put(key, ["why THIS course?", QUESTIONS[2]])
+    assert cache.get(key, 3) == QUESTIONS
+    assert cache.cache_stats()["hits"] == 2
+
+
+def test_pool_size_caps_the_pool():
+    cache = QuestionCache(pool_size=2)
+    cache.put("key", QUESTIONS)
+    assert cache.get("key", 2) == QUESTIONS[:2]
+    assert cache.get("key", 3) is None
+
+
+def test_expired_entries_miss():
+    cache = QuestionCache(ttl_seconds=60)
+    cache.put("key", QUESTIONS)
+    cache._entries["key"]["created"] = time.time() - 120
+    assert cache.get("key", 1) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QuestionCache(max_entries=2)
+    cache.put("a", QUESTIONS)
+    cache.put("b", QUESTIONS)
+    cache.get("a", 1)
+    cache.put("c", QUESTIONS)
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+    assert cache.cache_stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    QuestionCache(disk_dir=str(tmp_path)).put("key", QUESTIONS)
+
+    restarted = QuestionCache(disk_dir=str(tmp_path))
+    assert restarted.get("key", 3) == QUESTIONS
+    assert restarted.cache_stats()["disk_hits"] == 1
+
+
+def test_diversity_samples_from_the_pool():
+    cache = QuestionCache(pool_size=3, diversity=1.0)
+    cache.put("key", QUESTIONS)
+    sample = cache.get("key", 2)
+    assert len(sample) == 2 and set(sample) <= set(QUESTIONS)
@@ -0,0 +1,82 @@
+"""
+SessionStore eviction: TTL, LRU by count and the memory cap, with active
+sessions pinned and completed ones handed to the archive hook.
+"""
+import time
+
+from session_store import SessionStore, estimate_bytes
+
+
+def make_session(active=False, completed=False, payload_bytes=10000):
+    return {"active": active, "completed": completed, "answers": ["x" * payload_bytes]}
+
+
+def test_memory_cap_evicts_least_recently_used_inactive_sessions():
+    session_bytes = estimate_bytes(make_session())
+    store = SessionStore(max_bytes=3 * session_bytes + session_bytes // 2)
+
+    for name in ("a", "b", "c"):
+        store[name] = make_session()
+    store.get("a")  # b is now the least recently used
+    store["d"] = make_session()
+
+    assert "b" not in store
+    assert all(name in store for name in ("a", "c", "d"))
+    assert store.total_bytes <= store.max_bytes
+    assert store.evictions["memory"] == 1
+
+
+def test_memory_cap_tracks_sessions_that_grow():
+    session_bytes = estimate_bytes(make_session())
+    store = SessionStore(max_bytes=3 * session_bytes)
+    store["a"] = make_session()
+    store["b"] = make_session()
+
+    store["b"]["answers"].append("y" * session_bytes)
+    store.touch("b")
+
+    assert "a" not in store
+    assert store.total_bytes == estimate_bytes(store["b"])
+
+
+def test_active_sessions_are_never_evicted():
+    session_bytes = estimate_bytes(make_session(active=True))
+    store = SessionStore(max_bytes=session_bytes)
+    store["a"] = make_session(active=True)
+    store["b"] = make_session(active=True)
+
+    assert len(store) == 2
+    assert store.evictions["memory"] == 0
+
+
+def test_count_cap_and_ttl():
+    store = SessionStore(max_sessions=2, ttl_seconds=60)
+    store["a"] = make_session()
+    store["b"] = make_session()
+    store["c"] = make_session()
+    assert "a" not in store
+    assert store.evictions["lru"] == 1
+
+    store._meta["b"]["last_access"] = time.time() - 120
+    store.evict()
+    assert "b" not in store and "c" in store
+    assert store.evictions["ttl"] == 1
+
+
+def test_completed_sessions_are_archived_on_eviction():
+    archived = []
+    store = SessionStore(max_sessions=1, on_archive=lambda session_id, session: archived.append(session_id))
+    store["done"] = make_session(completed=True)
+    store["abandoned"] = make_session()
+    store["next"] = make_session()
+
+    assert archived == ["done"]
+    assert store.archived == 1
+
+
+def test_objects_report_their_buffers_through_sizeof():
+    class Buffered:
+        def __sizeof__(self):
+            return 1_000_000
+
+    assert estimate_bytes({"transcriber": Buffered()}) > 1_000_000
@@ -0,0 +1,76 @@
+"""
+Tracer spans, context tags and latency histograms.
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tracing import Histogram, Tracer
+
+
+def in_fresh_context(fn):
+    # Bound tags live in a context variable, keep them from leaking into other tests
+    return contextvars.copy_context().run(fn)
+
+
+def test_span_records_duration_and_tags():
+    tracer = Tracer()
+    with tracer.span("transcription", streamed=True) as span:
+        time.sleep(0.01)
+        span.tag(audio_seconds=2.5)
+
+    [record] = tracer.recent()
+    assert record["stage"] == "transcription"
+    assert record["streamed"] is True
+    assert record["ms"] >= 10
+    stats = tracer.stats()["transcription"]
+    assert stats["count"] == 1
+    # Numeric tags are summed per stage, booleans are not
+    assert stats["totals"] == {"audio_seconds": 2.5}
+
+
+def test_failing_span_is_recorded_with_the_error():
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("audio_decode"):
+            raise ValueError("bad audio")
+    assert tracer.recent()[0]["error"] == "ValueError"
+
+
+def test_bound_tags_follow_into_propagated_calls():
+    tracer = Tracer()
+
+    @tracer.traced("chunk")
+    def work(index):
+        return index
+
+    def run():
+        tracer.bind(session_id="s1")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(tracer.propagate(work), range(3))) == [0, 1, 2]
+
+    in_fresh_context(run)
+    assert len(tracer.recent(session_id="s1")) == 3
+    assert tracer.recent(session_id="other") == []
+
+
+def test_recent_keeps_the_latest_spans():
+    tracer = Tracer(max_recent=2)
+    for stage in ("a", "b", "c"):
+        tracer.record(stage, 0.001)
+    assert [record["stage"] for record in tracer.recent()] == ["b", "c"]
+    assert tracer.stats()["a"]["count"] == 1
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = Histogram()
+    for value_ms in [3] * 90 + [150] * 9 + [700]:
+        histogram.observe(value_ms)
+
+    assert histogram.percentile(0.5) == 5
+    assert histogram.percentile(0.95) == 200
+    # The top bucket is capped by the slowest observation
+    assert histogram.percentile(1.0) == 700
+    assert histogram.snapshot()["buckets"] == {"5": 90, "200": 9, "1000": 1}
@@ -0,0 +1,148 @@
+"""
+tracing.py
+
+Lightweight per-stage latency tracing for the interview pipeline. Code wraps a
+stage in tracer.span("stage", **tags); the duration goes into a per-stage
+histogram with log-spaced buckets, numeric tags (token counts, audio seconds) are
+summed per stage, and the most recent spans are kept for inspection.
+
+Tags set with tracer.bind(session_id=...) live in a context variable and are added
+to every span in that context. InterviewRuntime copies the context into its worker
+pool, so spans recorded by the generator modules carry the session they ran for.
+"""
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds in milliseconds, the last bucket takes everything slower
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 60000, 120000, float("inf"))
+
+_context_tags = contextvars.ContextVar("trace_tags", default={})
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def observe(self, value_ms):
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.min_ms = value_ms if self.min_ms is None else min(self.min_ms, value_ms)
+        self.max_ms = value_ms if self.max_ms is None else max(self.max_ms, value_ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {
+                ("+inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(self.bounds, self.counts) if count
+            }
+        }
+
+
+class Span:
+    def __init__(self, stage, tags):
+        self.stage = stage
+        self.tags = tags
+
+    def tag(self, **tags):
+        """Attach tags known only once the stage is underway (token counts, sizes)"""
+        self.tags.update(tags)
+
+
+class Tracer:
+    def __init__(self, max_recent=1000):
+        self._histograms = {}
+        self._totals = {}
+        self._recent = deque(maxlen=max_recent)
+        self._lock = threading.Lock()
+
+    def bind(self, **tags):
+        """Add tags to every span recorded later in the current context"""
+        _context_tags.set(dict(_context_tags.get(), **tags))
+
+    @contextmanager
+    def span(self, stage, **tags):
+        span = Span(stage, dict(_context_tags.get(), **tags))
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.tag(error=type(e).__name__)
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, **span.tags)
+
+    def traced(self, stage):
+        """Decorator recording every call of a function as a span"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def propagate(self, fn):
+        """Wrap fn so calls made from other threads (executor.map) keep the current tags"""
+        context = contextvars.copy_context()
+        # A context can only be entered by one thread at a time, each call gets its own copy
+        return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+    def record(self, stage, seconds, **tags):
+        """Record a duration measured elsewhere"""
+        tags = dict(_context_tags.get(), **tags)
+        duration_ms = seconds * 1000.0
+        with self._lock:
+            if stage not in self._histograms:
+                self._histograms[stage] = Histogram()
+                self._totals[stage] = {}
+            self._histograms[stage].observe(duration_ms)
+            totals = self._totals[stage]
+            for key, value in tags.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
+            self._recent.append({"stage": stage, "ms": round(duration_ms, 3), "at": time.time(), **tags})
+
+    def stats(self):
+        with self._lock:
+            return {
+                stage: dict(histogram.snapshot(), totals=dict(self._totals[stage]))
+                for stage, histogram in self._histograms.items()
+            }
+
+    def recent(self, session_id=None, limit=100):
+        with self._lock:
+            spans = [span for span in self._recent if session_id is None or span.get("session_id") == session_id]
+        return spans[-limit:]
+
+
+tracer = Tracer()
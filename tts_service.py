@@ -0,0 +1,177 @@
+"""
+tts_service.py
+
+Text to speech for interview questions. A single worker thread owns one warm
+pyttsx3 engine (engines are not thread safe and slow to create) and renders
+questions to WAV, optionally re-encoded to Opus with ffmpeg. Rendered audio is
+cached by (text, voice, rate) with a byte cap, so questions pre-rendered while the
+candidate answers earlier ones can be sent to the browser immediately.
+"""
+import hashlib
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pyttsx3
+
+from tracing import tracer
+
+AUDIO_MIME_TYPES = {
+    "wav": "audio/wav",
+    "opus": "audio/ogg"
+}
+
+
+class TTSService:
+    def __init__(self, rate=160, voice_index=1, audio_format="wav", max_cache_bytes=64 * 1024 * 1024):
+        if audio_format not in AUDIO_MIME_TYPES:
+            raise ValueError(f"Unsupported TTS audio format: {audio_format}")
+        self.rate = rate
+        self.voice_index = voice_index
+        self.audio_format = audio_format
+        self.mime_type = AUDIO_MIME_TYPES[audio_format]
+        self.max_cache_bytes = max_cache_bytes
+
+        self.voice = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._cache_lock = threading.Lock()
+        self.cache_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "renders": 0, "evictions": 0, "errors": 0}
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._worker, name="tts-engine")
+            self._thread.daemon = True
+            self._thread.start()
+        self._ready.wait()
+
+    def _key(self, text, voice, rate):
+        return hashlib.sha1(f"{voice}|{rate}|{self.audio_format}|{text}".encode("utf-8")).hexdigest()
+
+    def get_cached(self, text, voice=None, rate=None):
+        """Return rendered audio if it is already cached, otherwise None"""
+        # Only the worker fills the cache, a lookup doesn't need the engine running
+        key = self._key(text, voice or self.voice, rate or self.rate)
+        with self._cache_lock:
+            audio = self._cache.get(key)
+            if audio is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+            return audio
+
+    def render(self, text, voice=None, rate=None):
+        """Return a Future with the audio bytes for text, rendering it if needed"""
+        self.start()
+        voice = voice or self.voice
+        rate = rate or self.rate
+        key = self._key(text, voice, rate)
+
+        future = Future()
+        with self._cache_lock:
+            audio = self._cache.get(key)
+            if audio is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                future.set_result(audio)
+                return future
+            # Share a render already queued for the same text
+            if key in self._in_flight:
+                return self._in_flight[key]
+            self.stats["misses"] += 1
+            self._in_flight[key] = future
+
+        self._queue.put((key, text, voice, rate, future))
+        return future
+
+    def synthesize(self, text, voice=None, rate=None):
+        """Blocking render of text to audio bytes"""
+        return self.render(text, voice=voice, rate=rate).result()
+
+    def prerender(self, texts):
+        """Queue texts for rendering so later requests hit the cache"""
+        for text in texts:
+            if text:
+                self.render(text)
+
+    def _store(self, key, audio):
+        with self._cache_lock:
+            self._in_flight.pop(key, None)
+            if len(audio) > self.max_cache_bytes:
+                return
+            while self._cache and self.cache_bytes + len(audio) > self.max_cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self.cache_bytes -= len(evicted)
+                self.stats["evictions"] += 1
+            self._cache[key] = audio
+            self.cache_bytes += len(audio)
+
+    def _encode_opus(self, wav_bytes):
+        cmd = ["ffmpeg", "-nostdin", "-i", "pipe:0", "-c:a", "libopus", "-b:a", "32k", "-f", "ogg", "pipe:1"]
+        return subprocess.run(cmd, input=wav_bytes, capture_output=True, check=True).stdout
+
+    def _render_wav(self, engine, text, voice, rate):
+        if voice:
+            engine.setProperty('voice', voice)
+        engine.setProperty('rate', rate)
+
+        # pyttsx3 can only render to a file
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            with open(path, 'rb') as wav_file:
+                return wav_file.read()
+        finally:
+            os.unlink(path)
+
+    def _worker(self):
+        engine = None
+        init_error = None
+        try:
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+            voices = engine.getProperty('voices')
+            if len(voices) > self.voice_index:
+                self.voice = voices[self.voice_index].id
+        except Exception as e:
+            print(f"Error initializing Text to Speech engine: {e}")
+            init_error = e
+        self._ready.set()
+
+        while True:
+            key, text, voice, rate, future = self._queue.get()
+            try:
+                if init_error is not None:
+                    raise RuntimeError(f"TTS engine unavailable: {init_error}")
+                with tracer.span("tts_render", chars=len(text)):
+                    audio = self._render_wav(engine, text, voice, rate)
+                if not audio:
+                    raise RuntimeError("TTS engine produced no audio")
+                if self.audio_format == "opus":
+                    audio = self._encode_opus(audio)
+                self.stats["renders"] += 1
+                self._store(key, audio)
+                future.set_result(audio)
+            except Exception as e:
+                print(f"Error with Text to Speech: {e}")
+                self.stats["errors"] += 1
+                with self._cache_lock:
+                    self._in_flight.pop(key, None)
+                future.set_exception(e)
+
+    def cache_stats(self):
+        with self._cache_lock:
+            return dict(self.stats, entries=len(self._cache), cache_bytes=self.cache_bytes)
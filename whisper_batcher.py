@@ -0,0 +1,217 @@
+"""
+whisper_batcher.py
+
+Batched Whisper transcription across sessions. Clips submitted within a short
+batching window (typically many candidates finishing the same scheduled question)
+are padded to 30 second log-mel windows, stacked, and run through one encoder pass
+and one batched greedy decode. Each caller gets its result through a Future.
+Decoding options are per batch, so only clips with the same initial prompt (in
+practice, unprompted ones) are decoded together.
+
+Clips longer than one window, and clips whose greedy decode looks unreliable by
+Whisper's own thresholds (compression ratio, average log probability), fall back
+to model.transcribe, which slides over long audio and retries at higher
+temperatures. Clips it would skip as silence come back empty.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from audio_conversion import WHISPER_SAMPLE_RATE, speech_regions, pack_speech
+from tracing import tracer
+
+WINDOW_SECONDS = 30
+# Thresholds model.transcribe uses to decide a decode needs a temperature fallback
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+TIMESTAMP_SECONDS = 0.02
+
+
+class BatchedTranscriber:
+    def __init__(self, registry, size="base", batch_wait=0.05, max_batch_size=8, fp16=False):
+        self.registry = registry
+        self.size = size
+        self.batch_wait = batch_wait
+        self.max_batch_size = max_batch_size
+        self.fp16 = fp16
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            "clips": 0,
+            "batches": 0,
+            "batched_clips": 0,
+            "max_batch_seen": 0,
+            "long_clips": 0,
+            "fallbacks": 0,
+            "no_speech_clips": 0,
+            "audio_seconds": 0.0,
+            "vad_clips": 0,
+            "vad_silent_clips": 0,
+            "vad_seconds_in": 0.0,
+            "vad_seconds_removed": 0.0
+        }
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="whisper-batcher")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def submit(self, audio, initial_prompt=None):
+        """Queue a 16 kHz float32 clip, returns a Future with a transcribe()-style result"""
+        self.start()
+        future = Future()
+        self.stats["clips"] += 1
+        self.stats["audio_seconds"] += audio.size / WHISPER_SAMPLE_RATE
+        self._queue.put({"audio": audio, "prompt": initial_prompt or None, "future": future})
+        return future
+
+    def transcribe(self, audio, initial_prompt=None):
+        """Blocking drop-in for WhisperModelRegistry.transcribe"""
+        return self.submit(audio, initial_prompt=initial_prompt).result()
+
+    def transcribe_speech(self, audio, initial_prompt=None, split=True):
+        """Transcribe only the speech in a clip, found by the energy/zero-crossing VAD.
+
+        Leading and trailing silence is dropped; with split, long answers are cut at
+        pauses into chunks of at most one window, which batch together instead of
+        falling back to the sliding transcribe. Segment times stay relative to audio.
+        """
+        with tracer.span("vad", audio_seconds=audio.size / WHISPER_SAMPLE_RATE):
+            regions = speech_regions(audio)
+        if split:
+            chunks = pack_speech(regions, WINDOW_SECONDS * WHISPER_SAMPLE_RATE)
+        else:
+            chunks = [(regions[0][0], regions[-1][1])] if regions else []
+
+        kept = sum(end - start for start, end in chunks)
+        self.stats["vad_clips"] += 1
+        self.stats["vad_seconds_in"] += audio.size / WHISPER_SAMPLE_RATE
+        self.stats["vad_seconds_removed"] += (audio.size - kept) / WHISPER_SAMPLE_RATE
+        if not chunks:
+            self.stats["vad_silent_clips"] += 1
+            return {"text": "", "segments": [], "language": None}
+
+        # Chunks share the prompt, so they land in the same batch
+        futures = [self.submit(audio[start:end], initial_prompt=initial_prompt) for start, end in chunks]
+        texts, segments, language = [], [], None
+        for (start, _), future in zip(chunks, futures):
+            result = future.result()
+            offset = start / WHISPER_SAMPLE_RATE
+            texts.append(result["text"].strip())
+            segments.extend(
+                dict(segment, start=segment["start"] + offset, end=segment["end"] + offset)
+                for segment in result.get("segments", [])
+            )
+            language = language or result.get("language")
+        return {"text": " ".join(text for text in texts if text), "segments": segments, "language": language}
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        # Give concurrent sessions a moment to join the same encoder pass
+        time.sleep(self.batch_wait)
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _transcribe_one(self, item):
+        with tracer.span("whisper_transcribe", audio_seconds=item["audio"].size / WHISPER_SAMPLE_RATE):
+            return self.registry.transcribe(item["audio"], size=self.size, fp16=self.fp16, initial_prompt=item["prompt"])
+
+    @staticmethod
+    def _segments(tokenizer, tokens, duration):
+        """Split a timestamped token sequence into transcribe()-style segments"""
+        segments = []
+        start, text_tokens = None, []
+        for token in tokens:
+            if token >= tokenizer.timestamp_begin:
+                timestamp = (token - tokenizer.timestamp_begin) * TIMESTAMP_SECONDS
+                if start is None:
+                    start = timestamp
+                    continue
+                if text_tokens:
+                    segments.append({"start": start, "end": timestamp, "text": tokenizer.decode(text_tokens)})
+                start, text_tokens = None, []
+            elif token < tokenizer.eot:
+                text_tokens.append(token)
+        if text_tokens:
+            # The decode ran out of tokens before closing the last segment
+            segments.append({"start": start or 0.0, "end": duration, "text": tokenizer.decode(text_tokens)})
+        return segments
+
+    def _decode_group(self, items):
+        """One encoder pass and batched decode for clips sharing the same prompt"""
+        import torch
+        import whisper
+        from whisper.tokenizer import get_tokenizer
+
+        model = self.registry.get(self.size)
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(item["audio"])), n_mels=model.dims.n_mels)
+            for item in items
+        ])
+        options = whisper.DecodingOptions(prompt=items[0]["prompt"], without_timestamps=False, fp16=self.fp16)
+        audio_seconds = sum(item["audio"].size for item in items) / WHISPER_SAMPLE_RATE
+        with tracer.span("whisper_batch", clips=len(items), audio_seconds=audio_seconds):
+            results = self.registry.decode(mel, size=self.size, options=options)
+
+        self.stats["batches"] += 1
+        self.stats["batched_clips"] += len(items)
+        self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(items))
+
+        for item, result in zip(items, results):
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                # transcribe() skips such a window, its text is usually hallucinated
+                self.stats["no_speech_clips"] += 1
+                item["future"].set_result({"text": "", "segments": [], "language": result.language})
+                continue
+            # Low confidence on a silent clip is expected, anywhere else it means a bad greedy decode
+            if result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or (
+                    result.avg_logprob < LOGPROB_THRESHOLD and result.no_speech_prob < NO_SPEECH_THRESHOLD):
+                self.stats["fallbacks"] += 1
+                item["future"].set_result(self._transcribe_one(item))
+                continue
+            tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                      language=result.language, task="transcribe")
+            duration = item["audio"].size / WHISPER_SAMPLE_RATE
+            item["future"].set_result({
+                "text": result.text,
+                "segments": self._segments(tokenizer, result.tokens, duration),
+                "language": result.language
+            })
+
+    def _run(self, batch):
+        groups = {}
+        for item in batch:
+            if item["future"].cancelled():
+                continue
+            if item["audio"].size > WINDOW_SECONDS * WHISPER_SAMPLE_RATE:
+                # Needs the sliding window of model.transcribe
+                self.stats["long_clips"] += 1
+                item["future"].set_result(self._transcribe_one(item))
+                continue
+            # DecodingOptions (and so the prompt) are shared by a batch
+            groups.setdefault(item["prompt"], []).append(item)
+
+        for items in groups.values():
+            self._decode_group(items)
+
+    def _loop(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                self._run(batch)
+            except Exception as e:
+                print(f"Error in batched transcription: {e}")
+                for item in batch:
+                    if not item["future"].done():
+                        item["future"].set_exception(e)
@@ -0,0 +1,97 @@
+"""
+whisper_registry.py
+
+Process-wide registry of loaded Whisper models. Each configured model size is
+loaded once (eagerly at startup via preload() or lazily on first use) and then
+shared by every interview session instead of being deserialized per answer.
+"""
+import threading
+import time
+
+from tracing import tracer
+
+
+class WhisperModelRegistry:
+    def __init__(self, sizes=("base",), device=None):
+        self.sizes = [size.strip() for size in sizes if size and size.strip()]
+        self.device = device
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        # Whisper installs kv-cache hooks on the model while decoding, so one
+        # model must not run two transcriptions at the same time.
+        self._run_locks = {}
+
+    def _lock_for(self, size):
+        with self._lock:
+            if size not in self._load_locks:
+                self._load_locks[size] = threading.Lock()
+                self._run_locks[size] = threading.Lock()
+            return self._load_locks[size]
+
+    def preload(self, report=None):
+        """Load every configured model size up front"""
+        for loaded, size in enumerate(self.sizes, start=1):
+            self.get(size)
+            if report is not None:
+                report(loaded / len(self.sizes))
+
+    def get(self, size="base"):
+        """Return the shared model for a size, loading it on first use"""
+        model = self._models.get(size)
+        if model is not None:
+            with self._lock:
+                self._stats[size]["hits"] += 1
+            return model
+
+        with self._lock_for(size):
+            # Another thread may have finished loading while we waited
+            model = self._models.get(size)
+            if model is not None:
+                with self._lock:
+                    self._stats[size]["hits"] += 1
+                return model
+
+            # Imported on first load so importing the app does not pull in torch
+            import whisper
+
+            print(f"Loading Whisper model '{size}'...")
+            start = time.perf_counter()
+            model = whisper.load_model(size, device=self.device)
+            load_seconds = time.perf_counter() - start
+            tracer.record("whisper_load", load_seconds, size=size)
+
+            memory_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+            memory_bytes += sum(b.numel() * b.element_size() for b in model.buffers())
+
+            with self._lock:
+                self._models[size] = model
+                self._stats[size] = {
+                    "load_seconds": round(load_seconds, 3),
+                    "memory_bytes": memory_bytes,
+                    "hits": 0,
+                    "misses": 1,
+                    "loaded_at": time.time()
+                }
+            print(f"Whisper model '{size}' loaded in {load_seconds:.2f}s ({memory_bytes / 1e6:.1f} MB)")
+            return model
+
+    def transcribe(self, audio, size="base", **kwargs):
+        """Transcribe with the shared model, serializing use of that model"""
+        model = self.get(size)
+        with self._run_locks[size]:
+            return model.transcribe(audio, **kwargs)
+
+    def decode(self, mel, size="base", options=None):
+        """Decode a batch of log-mel windows in one pass, serializing use of that model"""
+        import whisper
+
+        model = self.get(size)
+        with self._run_locks[size]:
+            return whisper.decode(model, mel.to(model.device), options or whisper.DecodingOptions())
+
+    def stats(self):
+        """Return load time, memory footprint and hit counts per model size"""
+        with self._lock:
+            return {size: dict(values) for size, values in self._stats.items()}